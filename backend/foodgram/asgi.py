@@ -1,7 +1,21 @@
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "foodgram.settings")
 
-application = get_asgi_application()
+ASGI_URLCONF = 'foodgram.asgi_urls'
+
+
+class FoodgramASGIHandler(ASGIHandler):
+    """Разрешает пути по foodgram.asgi_urls, где частые запросы на
+    чтение обслуживают асинхронные обработчики."""
+
+    async def get_response_async(self, request):
+        request.urlconf = ASGI_URLCONF
+        return await super().get_response_async(request)
+
+
+django.setup(set_prefix=False)
+application = FoodgramASGIHandler()
@@ -0,0 +1,17 @@
+"""Маршруты для ASGI: асинхронные обработчики частых запросов на чтение
+стоят перед обычными маршрутами из foodgram.urls. Их выбирает для
+каждого запроса обработчик из foodgram.asgi, под WSGI они не
+используются."""
+from django.urls import include, path
+
+from foodgram import urls
+from ingredients.urls import async_urlpatterns as ingredient_urls
+from recipes.urls import async_urlpatterns as recipe_urls
+from tags.urls import async_urlpatterns as tag_urls
+
+urlpatterns = [
+    path('api/', include(ingredient_urls)),
+    path('api/', include(recipe_urls)),
+    path('api/', include(tag_urls)),
+    *urls.urlpatterns,
+]
@@ -0,0 +1,166 @@
+"""Асинхронные обработчики частых запросов на чтение.
+
+Их маршруты (async_urlpatterns в urls.py приложений) подключает только
+foodgram.asgi_urls, под WSGI те же пути сразу обслуживает DRF. GET и
+HEAD обрабатываются через асинхронный ORM и кэш, остальные методы и
+форматы без асинхронного варианта (например, просмотр API в браузере)
+передаются обычному обработчику DRF, который выполняется в потоке.
+"""
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.translation import gettext_lazy as _
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler
+
+from foodgram.cache import aget_cache_version
+from foodgram.reference import (reference_cache_key, reference_headers,
+                                reference_not_modified)
+
+
+class AsyncTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication с поиском токена через асинхронный ORM.
+
+    Заголовок Authorization разбирает синхронный authenticate(), здесь
+    authenticate_credentials() лишь возвращает ключ.
+    """
+
+    def authenticate_credentials(self, key):
+        return key, None
+
+    async def aauthenticate(self, request):
+        credentials = self.authenticate(request)
+        if credentials is None:
+            return None
+        key = credentials[0]
+        token = await self.get_model().objects.select_related(
+            'user'
+        ).filter(key=key).afirst()
+        if token is None:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        return token.user, token
+
+
+class AsyncReadView(View):
+    """Асинхронный обработчик GET и HEAD. Прочие методы и форматы
+    передаются синхронному обработчику DRF sync_view для того же пути."""
+
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    # Форматы, которые отдаёт асинхронный обработчик.
+    async_formats = ('json',)
+    authentication = AsyncTokenAuthentication()
+    negotiation = DefaultContentNegotiation()
+    # Проверять ли токен до обработки запроса.
+    authenticate = True
+    sync_view = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Как и у APIView: аутентификация по токену, без сессий и CSRF.
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return await self.sync_dispatch(request, *args, **kwargs)
+        drf_request = Request(request)
+        try:
+            renderer, media_type = self.negotiation.select_renderer(
+                drf_request,
+                [renderer() for renderer in self.renderer_classes],
+            )
+        except exceptions.NotAcceptable:
+            return await self.sync_dispatch(request, *args, **kwargs)
+        if renderer.format not in self.async_formats:
+            return await self.sync_dispatch(request, *args, **kwargs)
+        drf_request.accepted_renderer = renderer
+        drf_request.accepted_media_type = media_type
+        try:
+            if self.authenticate:
+                user_auth = await self.authentication.aauthenticate(
+                    drf_request
+                )
+                if user_auth is not None:
+                    drf_request.user, drf_request.auth = user_auth
+            response = await self.get(drf_request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(drf_request, exc)
+        return self.finalize_response(drf_request, response)
+
+    async def sync_dispatch(self, request, *args, **kwargs):
+        return await sync_to_async(self.sync_view)(request, *args, **kwargs)
+
+    def handle_exception(self, request, exc):
+        if isinstance(exc, (
+            exceptions.NotAuthenticated, exceptions.AuthenticationFailed
+        )):
+            exc.auth_header = self.authentication.authenticate_header(
+                request
+            )
+        response = exception_handler(exc, {'request': request, 'view': self})
+        if response is None:
+            raise exc
+        return response
+
+    def finalize_response(self, request, response):
+        if isinstance(response, Response):
+            response.accepted_renderer = request.accepted_renderer
+            response.accepted_media_type = request.accepted_media_type
+            response.renderer_context = {
+                'view': self, 'request': request, 'response': response,
+            }
+            response.render()
+        return response
+
+    async def get(self, request, *args, **kwargs):
+        raise NotImplementedError
+
+
+class AsyncReferenceView(AsyncReadView):
+    """Асинхронный вариант ReferenceCacheMixin: справочник из памяти
+    процесса, ETag по его версии и готовый JSON в общем кэше."""
+
+    catalogue = None
+    # Как и ReferenceCacheMixin: пользователь для чтения справочника не
+    # нужен, токен не проверяется и не ищется в базе.
+    authenticate = False
+
+    async def get(self, request, *args, **kwargs):
+        version = await aget_cache_version(self.catalogue.CACHE_NAMESPACE)
+        not_modified = reference_not_modified(request, version)
+        if not_modified is not None:
+            return not_modified
+
+        key = reference_cache_key(self.catalogue, version, request)
+        content = await cache.aget(key)
+        if content is not None:
+            renderer = request.accepted_renderer
+            content_type = renderer.media_type
+            if renderer.charset:
+                content_type = f'{content_type}; charset={renderer.charset}'
+            response = HttpResponse(content, content_type=content_type)
+        else:
+            # Справочник перечитывается из базы только после смены версии.
+            catalogue = await sync_to_async(self.catalogue.get_catalogue)()
+            response = self.finalize_response(
+                request,
+                Response(self.get_data(request, catalogue, *args, **kwargs)),
+            )
+            await cache.aset(key, response.content)
+        for header, value in reference_headers(version).items():
+            response[header] = value
+        return response
+
+    def get_data(self, request, catalogue, *args, **kwargs):
+        raise NotImplementedError
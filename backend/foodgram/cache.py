@@ -0,0 +1,50 @@
+"""Версии пространств имён общего кэша.
+
+Версия — время последнего изменения данных пространства в секундах
+Unix. Она же служит ETag и Last-Modified справочников, поэтому каждое
+изменение увеличивает её хотя бы на единицу, даже если два изменения
+пришлись на одну секунду.
+"""
+import time
+
+from django.core.cache import cache
+
+
+def version_key(namespace):
+    return f'{namespace}:version'
+
+
+def get_cache_version(namespace):
+    """Версия пространства имён. Первым её записывает тот процесс,
+    который обратился к ней раньше остальных; остальные читают уже
+    записанное значение из общего кэша."""
+    key = version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time()), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_cache_version(namespace):
+    """Асинхронный вариант get_cache_version() для обработчиков ASGI."""
+    key = version_key(namespace)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, int(time.time()), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_cache_version(namespace):
+    """Делает устаревшими все записи пространства имён."""
+    key = version_key(namespace)
+    now = int(time.time())
+    try:
+        version = cache.incr(key)
+    except ValueError:
+        # Версии ещё нет или её вытеснили из кэша.
+        cache.add(key, now, timeout=None)
+        return
+    if version < now:
+        cache.set(key, now, timeout=None)
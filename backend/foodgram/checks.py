@@ -0,0 +1,21 @@
+import os
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+LOCAL_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+@register(Tags.caches)
+def shared_cache_check(app_configs, **kwargs):
+    """Версии справочников хранятся в кэше. Кэш в памяти процесса
+    у каждого воркера свой, и изменения тегов и ингредиентов видит
+    только тот воркер, который их сохранил."""
+    workers = int(os.getenv('WEB_CONCURRENCY', default=1))
+    if workers > 1 and settings.CACHES['default']['BACKEND'] == LOCAL_CACHE:
+        return [Warning(
+            'Кэш в памяти процесса не общий для воркеров gunicorn.',
+            hint='Укажите CACHE_BACKEND=file или CACHE_BACKEND=redis.',
+            id='foodgram.W001',
+        )]
+    return []
@@ -0,0 +1,91 @@
+"""Кэширование справочников (теги, ингредиенты) на стороне клиента
+и в общем кэше."""
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import permissions, status
+
+
+def reference_headers(version):
+    return {
+        'ETag': f'"{version}"',
+        'Last-Modified': http_date(version),
+    }
+
+
+def reference_not_modified(request, version):
+    """Ответ 304, если у клиента актуальная версия справочника."""
+    response = get_conditional_response(
+        request, etag=f'"{version}"', last_modified=version
+    )
+    if response is not None:
+        for header, value in reference_headers(version).items():
+            response[header] = value
+    return response
+
+
+def reference_cache_key(catalogue, version, request):
+    return (
+        f'rendered:{catalogue.CACHE_NAMESPACE}:{version}:'
+        f'{request.get_full_path()}'
+    )
+
+
+class ReferenceCacheMixin:
+    """Кэширование справочников (теги, ингредиенты) на стороне клиента
+    и в общем кэше.
+
+    ETag и Last-Modified берутся из версии справочника (get_version()
+    модуля catalogue), поэтому ответ 304 отдаётся без запросов к базе.
+    Готовый JSON хранится в кэше по пути запроса и версии.
+    """
+
+    catalogue = None
+
+    def perform_authentication(self, request):
+        # Для чтения справочника в JSON пользователь не нужен: не проверяем
+        # токен заранее, чтобы не ходить за ним в базу.
+        if (
+            request.method not in permissions.SAFE_METHODS
+            or request.accepted_renderer.format != 'json'
+        ):
+            super().perform_authentication(request)
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        renderer = request.accepted_renderer
+        if renderer.format != 'json':
+            return handler(request, *args, **kwargs)
+
+        version = self.catalogue.get_version()
+        not_modified = reference_not_modified(request, version)
+        if not_modified is not None:
+            return not_modified
+
+        key = reference_cache_key(self.catalogue, version, request)
+        content = cache.get(key)
+        if content is not None:
+            content_type = renderer.media_type
+            if renderer.charset:
+                content_type = f'{content_type}; charset={renderer.charset}'
+            response = HttpResponse(content, content_type=content_type)
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            response.accepted_renderer = renderer
+            response.accepted_media_type = request.accepted_media_type
+            response.renderer_context = self.get_renderer_context()
+            response.render()
+            cache.set(key, response.content)
+        for header, value in reference_headers(version).items():
+            response[header] = value
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, super().retrieve, *args, **kwargs
+        )
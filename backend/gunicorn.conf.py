@@ -0,0 +1,12 @@
+"""Настройки gunicorn. SERVER_INTERFACE выбирает, как запускается
+бэкенд: wsgi (по умолчанию, синхронные воркеры) или asgi (воркеры
+uvicorn и асинхронные обработчики частых запросов на чтение)."""
+import os
+
+bind = '0:8000'
+
+if os.getenv('SERVER_INTERFACE', default='wsgi') == 'asgi':
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    wsgi_app = 'foodgram.asgi:application'
+else:
+    wsgi_app = 'foodgram.wsgi:application'
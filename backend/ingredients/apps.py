@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class IngredientsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ingredients'
+
+    def ready(self):
+        from foodgram import checks  # noqa: F401
+
+        from . import signals  # noqa: F401
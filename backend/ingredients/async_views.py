@@ -0,0 +1,25 @@
+from django.http import Http404
+
+from foodgram.async_views import AsyncReferenceView
+from ingredients import catalogue
+from ingredients.serializers import IngredientSerializer
+from ingredients.views import IngredientViewSet
+
+
+class IngredientListView(AsyncReferenceView):
+    catalogue = catalogue
+
+    def get_data(self, request, catalogue):
+        name = request.query_params.get('name', '')
+        ingredients = catalogue.search(name, IngredientViewSet.search_limit)
+        return IngredientSerializer(ingredients, many=True).data
+
+
+class IngredientDetailView(AsyncReferenceView):
+    catalogue = catalogue
+
+    def get_data(self, request, catalogue, pk):
+        ingredient = catalogue.get(pk)
+        if ingredient is None:
+            raise Http404
+        return IngredientSerializer(ingredient).data
@@ -0,0 +1,82 @@
+from bisect import bisect_left
+
+from foodgram.cache import bump_cache_version, get_cache_version
+
+from .models import Ingredient
+
+CACHE_NAMESPACE = 'ingredients'
+
+_catalogue = None
+
+
+class IngredientIndex:
+    """Отсортированный по названию массив ингредиентов.
+
+    Поиск по префиксу выполняется бинарным поиском, по подстроке —
+    проходом по заранее приведённым к нижнему регистру названиям.
+    """
+
+    def __init__(self, ingredients):
+        self.ingredients = sorted(
+            ingredients, key=lambda ingredient: ingredient.name.lower()
+        )
+        self.names = [
+            ingredient.name.lower() for ingredient in self.ingredients
+        ]
+
+    def search(self, name, limit):
+        name = name.lower()
+        found = []
+        position = bisect_left(self.names, name)
+        while (
+            len(found) < limit
+            and position < len(self.names)
+            and self.names[position].startswith(name)
+        ):
+            found.append(self.ingredients[position])
+            position += 1
+        for ingredient, ingredient_name in zip(self.ingredients, self.names):
+            if len(found) >= limit:
+                break
+            if name in ingredient_name and not ingredient_name.startswith(
+                name
+            ):
+                found.append(ingredient)
+        return found
+
+
+class IngredientCatalogue:
+    """Снимок справочника ингредиентов в памяти процесса."""
+
+    def __init__(self, version, ingredients):
+        self.version = version
+        self.by_id = {ingredient.id: ingredient for ingredient in ingredients}
+        self.index = IngredientIndex(self.by_id.values())
+
+    def get(self, ingredient_id):
+        return self.by_id.get(ingredient_id)
+
+    def search(self, name, limit):
+        """Сначала совпадения по началу названия, затем по подстроке."""
+        return self.index.search(name, limit)
+
+
+def get_version():
+    return get_cache_version(CACHE_NAMESPACE)
+
+
+def bump_version():
+    """Помечает справочник изменённым во всех процессах."""
+    global _catalogue
+    _catalogue = None
+    bump_cache_version(CACHE_NAMESPACE)
+
+
+def get_catalogue():
+    """Возвращает справочник, перечитывая его из базы только после
+    смены версии."""
+    global _catalogue
+    version = get_version()
+    if _catalogue is None or _catalogue.version != version:
+        _catalogue = IngredientCatalogue(version, Ingredient.objects.all())
+    return _catalogue
@@ -1,24 +1,127 @@
 import csv
+import io
+import json
+import time
+from itertools import islice
+from pathlib import Path
 
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 
+from ingredients.catalogue import bump_version
 from ingredients.models import Ingredient
 
+DEFAULT_PATH = Path(settings.BASE_DIR) / 'data' / 'ingredients.csv'
+
 
 class Command(BaseCommand):
+    help = 'Загружает ингредиенты из CSV или JSON файла'
 
     def add_arguments(self, parser):
-        parser.add_argument('--path', type=str, help='Путь к файлу')
+        parser.add_argument(
+            '--path',
+            type=str,
+            default=str(DEFAULT_PATH),
+            help='Путь к файлу (.csv или .json)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Количество строк в одной пачке вставки',
+        )
+        parser.add_argument(
+            '--copy',
+            action='store_true',
+            help='Загрузить через COPY во временную таблицу (PostgreSQL)',
+        )
 
     def handle(self, *args, **options):
-        file_path = 'data/ingredients.csv'
-        with open(file_path, 'r') as csv_file:
-            reader = csv.reader(csv_file)
-            for row in reader:
-                try:
-                    Ingredient.objects.get_or_create(
-                        name=row[0],
-                        measurement_unit=row[1],
-                    )
-                except Exception as error:
-                    print(f'Ошибка в строке {row}: {error}')
+        path = Path(options['path'])
+        if not path.is_file():
+            raise CommandError(f'Файл {path} не найден')
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('--copy поддерживается только для PostgreSQL')
+
+        started = time.monotonic()
+        rows = self.unique_rows(self.read_rows(path))
+        before = Ingredient.objects.count()
+        try:
+            if options['copy']:
+                self.copy_rows(rows, options['batch_size'])
+            else:
+                self.insert_rows(rows, options['batch_size'])
+        finally:
+            bump_version()
+        created = Ingredient.objects.count() - before
+
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(self.style.SUCCESS(
+            f'Прочитано строк: {self.read_count}, '
+            f'добавлено ингредиентов: {created}, '
+            f'{self.read_count / elapsed:.0f} строк/с'
+        ))
+
+    def read_rows(self, path):
+        if path.suffix.lower() == '.json':
+            with open(path, encoding='utf-8') as json_file:
+                for number, item in enumerate(json.load(json_file), 1):
+                    try:
+                        yield number, item['name'], item['measurement_unit']
+                    except (KeyError, TypeError):
+                        raise CommandError(
+                            f'Ошибка в записи {number}: {item}'
+                        )
+            return
+        with open(path, encoding='utf-8', newline='') as csv_file:
+            for number, row in enumerate(csv.reader(csv_file), 1):
+                if len(row) != 2:
+                    raise CommandError(f'Ошибка в строке {number}: {row}')
+                yield number, row[0], row[1]
+
+    def unique_rows(self, rows):
+        self.read_count = 0
+        seen = set()
+        for number, name, measurement_unit in rows:
+            self.read_count += 1
+            key = (name.strip(), measurement_unit.strip())
+            if not all(key):
+                raise CommandError(f'Пустое значение в строке {number}')
+            if key not in seen:
+                seen.add(key)
+                yield key
+
+    @transaction.atomic
+    def insert_rows(self, rows, batch_size):
+        while batch := list(islice(rows, batch_size)):
+            Ingredient.objects.bulk_create(
+                [
+                    Ingredient(name=name, measurement_unit=measurement_unit)
+                    for name, measurement_unit in batch
+                ],
+                ignore_conflicts=True,
+            )
+
+    def copy_rows(self, rows, batch_size):
+        table = Ingredient._meta.db_table
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE ingredients_staging '
+                '(name varchar(200), measurement_unit varchar(10)) '
+                'ON COMMIT DROP'
+            )
+            while batch := list(islice(rows, batch_size)):
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(batch)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    'COPY ingredients_staging (name, measurement_unit) '
+                    'FROM STDIN WITH (FORMAT csv)',
+                    buffer,
+                )
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                f'SELECT name, measurement_unit FROM ingredients_staging '
+                f'ON CONFLICT (name, measurement_unit) DO NOTHING'
+            )
@@ -0,0 +1,70 @@
+# Generated by Django 4.2.6 on 2026-10-18 18:11
+
+from django.db import migrations, models
+
+# Модели, ссылающиеся на ингредиент: (модель, второе поле уникального
+# ключа, поле количества).
+REFERENCES = (
+    ('RecipeIngredient', 'recipe_id', 'amount'),
+    ('ShoppingListItem', 'user_id', 'total_amount'),
+)
+
+
+def merge_duplicates(apps, schema_editor):
+    """Оставляет по одному ингредиенту с каждой парой (название,
+    единица измерения). Ссылки на дубликаты переносятся на оставшийся
+    ингредиент, количества одного рецепта или списка складываются."""
+    Ingredient = apps.get_model('ingredients', 'Ingredient')
+    duplicates = (
+        Ingredient.objects.values('name', 'measurement_unit')
+        .annotate(count=models.Count('id'), keep_id=models.Min('id'))
+        .filter(count__gt=1)
+    )
+    for group in duplicates.iterator():
+        extra_ids = list(
+            Ingredient.objects.filter(
+                name=group['name'],
+                measurement_unit=group['measurement_unit'],
+            )
+            .exclude(id=group['keep_id'])
+            .values_list('id', flat=True)
+        )
+        for model_name, owner_field, amount_field in REFERENCES:
+            model = apps.get_model('recipes', model_name)
+            kept = {
+                getattr(row, owner_field): row
+                for row in model.objects.filter(ingredient_id=group['keep_id'])
+            }
+            for row in model.objects.filter(ingredient_id__in=extra_ids):
+                owner = getattr(row, owner_field)
+                if owner in kept:
+                    target = kept[owner]
+                    setattr(
+                        target,
+                        amount_field,
+                        getattr(target, amount_field)
+                        + getattr(row, amount_field),
+                    )
+                    target.save(update_fields=[amount_field])
+                    row.delete()
+                else:
+                    row.ingredient_id = group['keep_id']
+                    row.save(update_fields=['ingredient'])
+                    kept[owner] = row
+        Ingredient.objects.filter(id__in=extra_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingredients', '0002_ingredient_name_search_indexes'),
+        ('recipes', '0004_shoppinglistitem'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient_name_unit'),
+        ),
+    ]
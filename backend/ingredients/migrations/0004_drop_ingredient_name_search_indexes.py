@@ -0,0 +1,37 @@
+from django.db import migrations
+
+# Поиск по названию выполняет справочник в памяти процесса
+# (ingredients.catalogue), поэтому индексы из 0002 только замедляют
+# запись. Расширение pg_trgm остаётся: его могут использовать другие
+# базы кластера.
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS ingredient_name_trgm_idx')
+    schema_editor.execute('DROP INDEX IF EXISTS ingredient_name_prefix_idx')
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS ingredient_name_trgm_idx '
+        'ON ingredients_ingredient USING gin (upper(name) gin_trgm_ops)'
+    )
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS ingredient_name_prefix_idx '
+        'ON ingredients_ingredient (upper(name) text_pattern_ops)'
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('ingredients', '0003_ingredient_unique_name_unit'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_search_indexes, create_search_indexes),
+    ]
@@ -1,5 +1,8 @@
 from rest_framework import serializers
 
+from recipes.fields import BulkPrimaryKeyRelatedField
+
+from .catalogue import get_catalogue
 from .models import Ingredient
 
 
@@ -12,3 +15,19 @@ class IngredientSerializer(serializers.ModelSerializer):
 class IngredientInputSerializer(serializers.Serializer):
     id = serializers.IntegerField()
     amount = serializers.CharField()
+
+
+class IngredientField(BulkPrimaryKeyRelatedField):
+    """Находит ингредиенты в справочнике процесса, а не запросом к базе.
+
+    Ингредиенты, которых ещё нет в снимке справочника (добавлены в
+    другом процессе), ищутся в базе.
+    """
+
+    def resolve(self, pks):
+        by_id = get_catalogue().by_id
+        found = {pk: by_id[pk] for pk in pks if pk in by_id}
+        missing = set(pks) - found.keys()
+        if missing:
+            found.update(super().resolve(missing))
+        return found
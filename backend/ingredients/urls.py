@@ -1,6 +1,7 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from .async_views import IngredientDetailView, IngredientListView
 from .views import IngredientViewSet
 
 app_name = 'ingredients'
@@ -8,6 +9,20 @@ app_name = 'ingredients'
 router_v1 = DefaultRouter()
 
 router_v1.register('ingredients', IngredientViewSet, basename='ingredients')
+drf_views = {url.name: url.callback for url in router_v1.urls}
+
+async_urlpatterns = [
+    path(
+        'ingredients/',
+        IngredientListView.as_view(sync_view=drf_views['ingredients-list']),
+    ),
+    path(
+        'ingredients/<int:pk>/',
+        IngredientDetailView.as_view(
+            sync_view=drf_views['ingredients-detail']
+        ),
+    ),
+]
 
 urlpatterns = [
     path('', include(router_v1.urls)),
@@ -1,22 +1,49 @@
+from django.http import Http404
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from foodgram.reference import ReferenceCacheMixin
+from ingredients import catalogue
+from ingredients.catalogue import get_catalogue
 from ingredients.models import Ingredient
 from ingredients.serializers import IngredientSerializer
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
+class IngredientViewSet(ReferenceCacheMixin, viewsets.ModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
+    catalogue = catalogue
+    search_limit = 100
 
     def get_queryset(self):
+        if self.action != 'list':
+            return super().get_queryset()
+        return self.search_ingredients()
+
+    def search_ingredients(self):
         name = self.request.query_params.get('name', '')
-        return Ingredient.objects.filter(name__icontains=name)
+        return get_catalogue().search(name, self.search_limit)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, self.retrieve_from_catalogue, *args, **kwargs
+        )
+
+    def retrieve_from_catalogue(self, request, *args, **kwargs):
+        try:
+            ingredient = get_catalogue().get(int(kwargs['pk']))
+        except ValueError:
+            ingredient = None
+        if ingredient is None:
+            raise Http404
+        serializer = self.get_serializer(ingredient)
+        return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def search(self, request):
-        name = self.request.query_params.get('name', '')
-        ingredients = Ingredient.objects.filter(name__icontains=name)
-        serializer = IngredientSerializer(ingredients, many=True)
+        return self.cached_response(request, self.search_response)
+
+    def search_response(self, request):
+        serializer = IngredientSerializer(self.search_ingredients(), many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
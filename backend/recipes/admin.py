@@ -1,8 +1,8 @@
 from django.contrib import admin
-from django.db.models import Count
 from django.utils.html import mark_safe
 
 from .models import Favorite, Recipe
+from .search import search_recipes
 
 
 class RecipeIngredientsInLine(admin.TabularInline):
@@ -26,7 +26,7 @@ class RecipeAdmin(admin.ModelAdmin):
         'get_image',
         'count_favorites',
     )
-    search_fields = ('name', 'author')
+    search_fields = ('name',)
     inlines = (RecipeIngredientsInLine, RecipeTagsInLine)
 
     def get_image(self, obj):
@@ -36,15 +36,21 @@ class RecipeAdmin(admin.ModelAdmin):
 
     get_image.short_description = 'Изображение'
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return search_recipes(queryset, search_term), False
+
+    def save_model(self, request, obj, form, change):
+        if 'image' in form.changed_data:
+            obj.image_variants_ready = False
+        super().save_model(request, obj, form, change)
+
     def count_favorites(self, obj):
-        return obj.favorite_count
+        return obj.favorites_count
 
     count_favorites.short_description = 'В избранном'
-
-    def get_queryset(self, request):
-        queryset = super().get_queryset(request)
-        queryset = queryset.annotate(favorite_count=Count('favorites'))
-        return queryset
+    count_favorites.admin_order_field = 'favorites_count'
 
 
 @admin.register(Favorite)
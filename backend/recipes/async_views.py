@@ -0,0 +1,79 @@
+"""Асинхронные обработчики списка и просмотра рецептов и скачивания
+списка покупок (см. foodgram.async_views)."""
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from rest_framework import exceptions
+from rest_framework.response import Response
+
+from foodgram.async_views import AsyncReadView
+
+from .cache import aget_cached_recipe, aset_cached_recipe
+from .views import (SHOPPING_LIST_RENDERERS, RecipeViewSet,
+                    apply_volatile_fields, cacheable_recipe_data,
+                    shopping_list_items, shopping_list_response,
+                    volatile_recipe_fields)
+
+
+class AsyncRecipeView(AsyncReadView):
+
+    def get_viewset(self, request, action, **kwargs):
+        return RecipeViewSet(
+            request=request,
+            action=action,
+            args=(),
+            kwargs=kwargs,
+            format_kwarg=None,
+        )
+
+
+class RecipeListView(AsyncRecipeView):
+
+    async def get(self, request):
+        viewset = self.get_viewset(request, 'list')
+        # Фильтры только строят запрос, но справочник тегов для них при
+        # смене версии перечитывается из базы.
+        queryset = await sync_to_async(viewset.filter_queryset)(
+            viewset.get_queryset()
+        )
+        paginator = viewset.paginator
+        page = await paginator.apaginate_queryset(queryset, request, viewset)
+        if page is None:
+            recipes = [recipe async for recipe in queryset]
+            return Response(viewset.get_serializer(recipes, many=True).data)
+        serializer = viewset.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class RecipeDetailView(AsyncRecipeView):
+
+    async def get(self, request, pk):
+        data = await aget_cached_recipe(pk)
+        if data is None:
+            viewset = self.get_viewset(request, 'retrieve', pk=pk)
+            recipe = await viewset.get_queryset().filter(pk=pk).afirst()
+            if recipe is None:
+                raise Http404
+            data = viewset.get_serializer(recipe).data
+            await aset_cached_recipe(pk, cacheable_recipe_data(data))
+            return Response(data)
+
+        volatile = await volatile_recipe_fields(pk, request.user).afirst()
+        if volatile is None:
+            raise Http404
+        return Response(apply_volatile_fields(data, volatile))
+
+
+class ShoppingCartDownloadView(AsyncReadView):
+    renderer_classes = SHOPPING_LIST_RENDERERS
+    async_formats = tuple(
+        renderer.format for renderer in SHOPPING_LIST_RENDERERS
+    )
+
+    async def get(self, request):
+        if not request.user.is_authenticated:
+            raise exceptions.NotAuthenticated()
+        renderer = request.accepted_renderer
+        return shopping_list_response(
+            renderer,
+            renderer.astream(shopping_list_items(request.user).aiterator()),
+        )
@@ -0,0 +1,65 @@
+import time
+
+from django.core.cache import cache
+
+from foodgram.cache import aget_cache_version, get_cache_version
+
+
+def recipe_version_key(recipe_id):
+    return f'recipe:{recipe_id}:version'
+
+
+def recipe_data_key(recipe_id, versions):
+    return (
+        f'recipe:{recipe_id}:data:{versions["recipes:version"]}:'
+        f'{versions[recipe_version_key(recipe_id)]}'
+    )
+
+
+def get_cached_recipe(recipe_id):
+    """Возвращает закэшированную независимую от пользователя часть
+    представления рецепта или None."""
+    versions = cache.get_many(
+        ['recipes:version', recipe_version_key(recipe_id)]
+    )
+    if len(versions) < 2:
+        return None
+    return cache.get(recipe_data_key(recipe_id, versions))
+
+
+async def aget_cached_recipe(recipe_id):
+    versions = await cache.aget_many(
+        ['recipes:version', recipe_version_key(recipe_id)]
+    )
+    if len(versions) < 2:
+        return None
+    return await cache.aget(recipe_data_key(recipe_id, versions))
+
+
+def set_cached_recipe(recipe_id, data):
+    versions = {
+        'recipes:version': get_cache_version('recipes'),
+        recipe_version_key(recipe_id): cache.get_or_set(
+            recipe_version_key(recipe_id), time.time_ns, timeout=None
+        ),
+    }
+    cache.set(recipe_data_key(recipe_id, versions), data)
+
+
+async def aset_cached_recipe(recipe_id, data):
+    versions = {
+        'recipes:version': await aget_cache_version('recipes'),
+        recipe_version_key(recipe_id): await cache.aget_or_set(
+            recipe_version_key(recipe_id), time.time_ns, timeout=None
+        ),
+    }
+    await cache.aset(recipe_data_key(recipe_id, versions), data)
+
+
+def bump_recipe_versions(recipe_ids):
+    """Сбрасывает кэш представления указанных рецептов."""
+    version = time.time_ns()
+    cache.set_many(
+        {recipe_version_key(recipe_id): version for recipe_id in recipe_ids},
+        timeout=None,
+    )
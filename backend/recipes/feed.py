@@ -0,0 +1,110 @@
+"""Лента рецептов авторов, на которых подписан пользователь.
+
+Новый рецепт при публикации записывается в ленту каждого подписчика
+(таблица FeedEntry), и чтение ленты — это диапазон по индексу
+(user, -created_at, -recipe), сколько бы авторов ни было в подписках.
+Рецепты авторов, у которых больше FEED_FANOUT_LIMIT подписчиков, не
+раскладываются: такие авторы попадают в PopularAuthor, и их рецепты
+подмешиваются при чтении по индексу (author, -created_at).
+"""
+import heapq
+
+from django.conf import settings
+from django.db.models import Q
+
+from users.models import Subscription
+
+from .models import FeedEntry, PopularAuthor, Recipe
+
+FANOUT_BATCH_SIZE = 1000
+# Сколько последних рецептов автора попадает в ленту при подписке.
+BACKFILL_SIZE = 100
+
+
+def fan_out(recipe):
+    """Раскладывает рецепт по лентам подписчиков автора."""
+    if PopularAuthor.objects.filter(author_id=recipe.author_id).exists():
+        return
+    subscribers = Subscription.objects.filter(author_id=recipe.author_id)
+    if subscribers.count() > settings.FEED_FANOUT_LIMIT:
+        # Обратно в обычные авторы не переводим: уже разложенные
+        # рецепты остаются в лентах, остальные подмешиваются при чтении.
+        PopularAuthor.objects.get_or_create(author_id=recipe.author_id)
+        return
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=user_id,
+                recipe_id=recipe.pk,
+                created_at=recipe.created_at,
+            )
+            for user_id in subscribers.values_list('user_id', flat=True)
+        ),
+        batch_size=FANOUT_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту последние рецепты автора после подписки."""
+    if PopularAuthor.objects.filter(author_id=author_id).exists():
+        return
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=user_id, recipe_id=pk, created_at=created_at)
+            for pk, created_at in Recipe.objects.filter(
+                author_id=author_id
+            ).order_by('-created_at').values_list(
+                'pk', 'created_at'
+            )[:BACKFILL_SIZE]
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def remove_author(user_id, author_id):
+    FeedEntry.objects.filter(
+        user_id=user_id, recipe__author_id=author_id
+    ).delete()
+
+
+def _before(position, created_at_field, id_field):
+    if position is None:
+        return Q()
+    created_at, recipe_id = position
+    return Q(**{f'{created_at_field}__lt': created_at}) | Q(**{
+        created_at_field: created_at, f'{id_field}__lt': recipe_id,
+    })
+
+
+def read_feed(user, position=None, limit=10):
+    """Возвращает до limit пар (created_at, id рецепта), новые первыми,
+    строго после позиции position, и признак следующей страницы."""
+    sources = [
+        FeedEntry.objects.filter(
+            _before(position, 'created_at', 'recipe_id'), user=user
+        ).order_by('-created_at', '-recipe_id').values_list(
+            'created_at', 'recipe_id'
+        )[:limit + 1]
+    ]
+    popular_ids = list(
+        Subscription.objects.filter(
+            user=user,
+            author__in=PopularAuthor.objects.values('author'),
+        ).values_list('author_id', flat=True)
+    )
+    if popular_ids:
+        sources.append(
+            Recipe.objects.filter(
+                _before(position, 'created_at', 'id'),
+                author_id__in=popular_ids,
+            ).order_by('-created_at', '-id').values_list(
+                'created_at', 'id'
+            )[:limit + 1]
+        )
+    # Рецепт автора, ставшего популярным, может быть и в самой ленте.
+    entries = []
+    for entry in heapq.merge(*sources, reverse=True):
+        if not entries or entries[-1] != entry:
+            entries.append(entry)
+    return entries[:limit], len(entries) > limit
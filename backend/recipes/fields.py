@@ -0,0 +1,61 @@
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """Список связанных объектов, который разрешается целиком, а не
+    по одному элементу."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        return self.child_relation.resolve_all(data)
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """PrimaryKeyRelatedField, который с many=True находит все объекты
+    одним запросом id__in и сообщает обо всех неверных ключах сразу."""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        list_kwargs.update(
+            (key, value)
+            for key, value in kwargs.items()
+            if key in MANY_RELATION_KWARGS
+        )
+        return BulkManyRelatedField(**list_kwargs)
+
+    def resolve(self, pks):
+        """Возвращает словарь {pk: объект} для найденных ключей."""
+        return self.get_queryset().in_bulk(pks)
+
+    def to_pk(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+    def resolve_all(self, data):
+        pks, errors = [], []
+        for value in data:
+            try:
+                pks.append(self.to_pk(value))
+            except serializers.ValidationError as exc:
+                errors.extend(exc.detail)
+        found = self.resolve(set(pks)) if pks else {}
+        errors.extend(
+            self.error_messages['does_not_exist'].format(pk_value=pk)
+            for pk in dict.fromkeys(pks)
+            if pk not in found
+        )
+        if errors:
+            raise serializers.ValidationError(errors)
+        return [found[pk] for pk in pks]
+
+    def to_internal_value(self, data):
+        return self.resolve_all([data])[0]
@@ -1,8 +1,14 @@
 import django_filters
-from django_filters.rest_framework import ModelMultipleChoiceFilter
+from django.db.models import Exists, OuterRef
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
 
 from recipes.models import Favorite, Recipe, ShoppingCart
-from tags.models import Tag
+from recipes.search import search_recipes
+from tags.catalogue import get_catalogue
+
+
+def tag_choices():
+    return get_catalogue().choices()
 
 
 class RecipeFilter(django_filters.FilterSet):
@@ -18,16 +24,23 @@ class RecipeFilter(django_filters.FilterSet):
         method='filter_by_author',
         label='Автор',
     )
-    tags = ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all(),
+    tags = django_filters.MultipleChoiceFilter(
+        choices=tag_choices,
+        method='filter_tags',
         label='Теги',
     )
+    tags_mode = django_filters.ChoiceFilter(
+        choices=(('any', 'Любой из тегов'), ('all', 'Все теги')),
+        method='filter_tags_mode',
+        label='Режим фильтра по тегам',
+    )
 
     class Meta:
         model = Recipe
-        fields = ['tags', 'is_favorited', 'is_in_shopping_cart', 'author']
+        fields = [
+            'tags', 'tags_mode', 'is_favorited', 'is_in_shopping_cart',
+            'author',
+        ]
 
     def get_is_favorited(self, queryset, name, value):
         user = self.request.user
@@ -65,6 +78,42 @@ class RecipeFilter(django_filters.FilterSet):
         return queryset.filter(author__id=value)
 
     def filter_tags(self, queryset, name, value):
-        tags = value.split(',')
-        tag_objects = Tag.objects.filter(name__in=tags)
-        return queryset.filter(tags__in=tag_objects)
+        """Фильтрует полусоединением EXISTS по таблице связи, поэтому
+        рецепты с несколькими подходящими тегами не дублируются."""
+        tags = get_catalogue().by_slug
+        tag_ids = [tags[slug].id for slug in value]
+        recipe_tags = Recipe.tags.through.objects.filter(
+            recipe=OuterRef('pk')
+        )
+        if self.form.cleaned_data.get('tags_mode') == 'all':
+            for tag_id in tag_ids:
+                queryset = queryset.filter(
+                    Exists(recipe_tags.filter(tag_id=tag_id))
+                )
+            return queryset
+        return queryset.filter(Exists(recipe_tags.filter(tag_id__in=tag_ids)))
+
+    def filter_tags_mode(self, queryset, name, value):
+        return queryset
+
+
+class RecipeSearchFilter(BaseFilterBackend):
+    """Полнотекстовый поиск ?search= по названию, описанию
+    и ингредиентам рецепта.
+
+    Должен стоять после OrderingFilter: без явного ?ordering= найденные
+    рецепты сортируются по релевантности, а при равной — как в ленте.
+    """
+
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        queryset = search_recipes(queryset, query)
+        if OrderingFilter.ordering_param not in request.query_params:
+            queryset = queryset.order_by(
+                '-search_rank', *queryset.query.order_by
+            )
+        return queryset
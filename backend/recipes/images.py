@@ -0,0 +1,154 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from .cache import bump_recipe_versions
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+# Формат варианта -> параметры сохранения Pillow. JPEG остаётся запасным
+# вариантом для клиентов без поддержки WebP.
+VARIANT_FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 85, 'optimize': True,
+             'progressive': True},
+}
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_WORKERS,
+            thread_name_prefix='recipe-images',
+        )
+    return _executor
+
+
+def thumbnail_name(image_name, image_format):
+    """Путь миниатюры рядом с оригиналом:
+    recipes_images/cake.png -> recipes_images/thumbnails/cake.png.webp.
+
+    Расширение оригинала остаётся в имени, чтобы миниатюры cake.png и
+    cake.jpg не перезаписывали друг друга."""
+    directory, filename = os.path.split(image_name)
+    return os.path.join(
+        directory, 'thumbnails', f'{filename}.{image_format}'
+    ).replace(os.sep, '/')
+
+
+def thumbnail_urls(recipe):
+    """Ссылки на миниатюры по форматам. Пока миниатюры не готовы,
+    все ссылки ведут на оригинал."""
+    if not recipe.image:
+        return None
+    if not recipe.image_variants_ready:
+        return dict.fromkeys(VARIANT_FORMATS, recipe.image.url)
+    return {
+        image_format: default_storage.url(
+            thumbnail_name(recipe.image.name, image_format)
+        )
+        for image_format in VARIANT_FORMATS
+    }
+
+
+def build_thumbnail_urls(request, recipe):
+    """То же, что thumbnail_urls(), но с абсолютными ссылками."""
+    urls = thumbnail_urls(recipe)
+    if urls is None or request is None:
+        return urls
+    return {
+        image_format: request.build_absolute_uri(url)
+        for image_format, url in urls.items()
+    }
+
+
+def render_thumbnails(image_name):
+    size = settings.RECIPE_THUMBNAIL_SIZE
+    with default_storage.open(image_name) as source:
+        with Image.open(source) as original:
+            image = ImageOps.exif_transpose(original)
+            image.thumbnail((size, size), Image.LANCZOS)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info
+                              else 'RGB')
+    for image_format, options in VARIANT_FORMATS.items():
+        variant = image
+        if options['format'] == 'JPEG' and variant.mode == 'RGBA':
+            # В JPEG нет прозрачности: подкладываем белый фон.
+            variant = Image.new('RGB', image.size, 'white')
+            variant.paste(image, mask=image.getchannel('A'))
+        buffer = BytesIO()
+        variant.save(buffer, **options)
+        name = thumbnail_name(image_name, image_format)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def delete_thumbnails(image_name):
+    for image_format in VARIANT_FORMATS:
+        name = thumbnail_name(image_name, image_format)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+
+
+def build_thumbnails(recipe_id):
+    """Создаёт миниатюры рецепта и отмечает их готовность.
+
+    Флаг ставится, только если изображение не сменилось за время
+    обработки, иначе это сделает задача для нового файла.
+    """
+    image_name = Recipe.objects.filter(pk=recipe_id).values_list(
+        'image', flat=True
+    ).first()
+    if not image_name:
+        return False
+    render_thumbnails(image_name)
+    updated = Recipe.objects.filter(pk=recipe_id, image=image_name).update(
+        image_variants_ready=True
+    )
+    if updated:
+        bump_recipe_versions([recipe_id])
+    else:
+        # Изображение заменили, пока строились миниатюры: старые
+        # варианты уже никому не нужны.
+        delete_thumbnails(image_name)
+    return bool(updated)
+
+
+def _build_thumbnails_task(recipe_id):
+    try:
+        build_thumbnails(recipe_id)
+    except Exception:
+        logger.exception(
+            'Не удалось создать миниатюры рецепта %s', recipe_id
+        )
+    finally:
+        # У каждого потока пула своё соединение с базой.
+        connection.close()
+
+
+def schedule_thumbnails_cleanup(image_name):
+    """Удаляет миниатюры заменённого изображения после фиксации
+    транзакции: при откате рецепт остаётся со старым изображением и
+    его миниатюрами."""
+    transaction.on_commit(lambda: delete_thumbnails(image_name))
+
+
+def schedule_thumbnails(recipe_id):
+    """Ставит обработку изображения в фоновый пул после фиксации
+    транзакции, чтобы поток увидел сохранённый рецепт."""
+    transaction.on_commit(
+        lambda: get_executor().submit(_build_thumbnails_task, recipe_id)
+    )
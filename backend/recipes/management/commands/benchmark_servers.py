@@ -0,0 +1,179 @@
+import http.client
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Класс воркеров указан явно, чтобы не зависеть от SERVER_INTERFACE
+# в gunicorn.conf.py.
+SERVERS = {
+    'wsgi': ['--worker-class', 'sync', 'foodgram.wsgi:application'],
+    'asgi': [
+        '--worker-class', 'uvicorn.workers.UvicornWorker',
+        'foodgram.asgi:application',
+    ],
+}
+DEFAULT_PATHS = [
+    '/api/recipes/?limit=6',
+    '/api/recipes/?limit=6&page=2',
+    '/api/tags/',
+    f'/api/ingredients/?name={quote("кар")}',
+]
+AUTHENTICATED_PATHS = [
+    '/api/recipes/download_shopping_cart/?format=csv',
+]
+START_TIMEOUT = 30
+
+
+def run_client(port, paths, headers, duration, offset):
+    """Шлёт запросы по кругу через одно keep-alive соединение и
+    возвращает задержки по путям и число ошибок."""
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    latencies = defaultdict(list)
+    errors = 0
+    number = offset
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        path = paths[number % len(paths)]
+        number += 1
+        started = time.perf_counter()
+        try:
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            continue
+        if response.status >= 400:
+            errors += 1
+            continue
+        latencies[path].append(time.perf_counter() - started)
+    connection.close()
+    return dict(latencies), errors
+
+
+def percentile(values, share):
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает запуск через WSGI (синхронные воркеры gunicorn) и '
+        'ASGI (воркеры uvicorn): запросы в секунду и задержки p50/p99'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--modes',
+            nargs='+',
+            choices=SERVERS,
+            default=list(SERVERS),
+            help='Какие режимы запускать',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=2, help='Воркеров gunicorn'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=16,
+            help='Одновременных клиентов (отдельных процессов)',
+        )
+        parser.add_argument(
+            '--duration', type=float, default=10, help='Секунд на режим'
+        )
+        parser.add_argument('--port', type=int, default=8100)
+        parser.add_argument(
+            '--token',
+            help='Токен пользователя: добавляет скачивание списка покупок',
+        )
+        parser.add_argument(
+            '--path',
+            action='append',
+            dest='paths',
+            help='Путь для запросов (можно несколько), вместо стандартных',
+        )
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or list(DEFAULT_PATHS)
+        headers = {'Accept': '*/*'}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+            if not options['paths']:
+                paths += AUTHENTICATED_PATHS
+        for mode in options['modes']:
+            server = self.start_server(mode, options['port'], options)
+            try:
+                self.report(mode, self.load(
+                    options['port'], paths, headers, options
+                ), options['duration'])
+            finally:
+                server.terminate()
+                server.wait()
+
+    def start_server(self, mode, port, options):
+        server = subprocess.Popen(
+            [
+                sys.executable, '-m', 'gunicorn',
+                '--bind', f'127.0.0.1:{port}',
+                '--workers', str(options['workers']),
+                '--log-level', 'warning',
+                *SERVERS[mode],
+            ],
+            cwd=settings.BASE_DIR,
+        )
+        deadline = time.monotonic() + START_TIMEOUT
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'{mode}: сервер не запустился')
+            try:
+                socket.create_connection(('127.0.0.1', port), 1).close()
+                return server
+            except OSError:
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError(f'{mode}: сервер не ответил за {START_TIMEOUT} с')
+
+    def load(self, port, paths, headers, options):
+        # Прогрев: первые запросы загружают справочники и наполняют кэш.
+        run_client(port, paths, headers, 1, 0)
+        concurrency = options['concurrency']
+        with ProcessPoolExecutor(concurrency) as executor:
+            return list(executor.map(
+                run_client,
+                [port] * concurrency,
+                [paths] * concurrency,
+                [headers] * concurrency,
+                [options['duration']] * concurrency,
+                range(concurrency),
+            ))
+
+    def report(self, mode, results, duration):
+        latencies = defaultdict(list)
+        errors = 0
+        for client_latencies, client_errors in results:
+            errors += client_errors
+            for path, values in client_latencies.items():
+                latencies[path].extend(values)
+        self.stdout.write(self.style.MIGRATE_HEADING(mode.upper()))
+        rows = [(path, sorted(values)) for path, values in latencies.items()]
+        rows.append((
+            'всего', sorted(value for _, values in rows for value in values)
+        ))
+        for path, values in rows:
+            if not values:
+                continue
+            self.stdout.write(
+                f'{path:<50} {len(values) / duration:8.1f} запр/с  '
+                f'p50 {percentile(values, 0.5) * 1000:7.1f} мс  '
+                f'p99 {percentile(values, 0.99) * 1000:7.1f} мс'
+            )
+        if errors:
+            self.stdout.write(self.style.WARNING(f'Ошибок: {errors}'))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import build_thumbnails
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт миниатюры для рецептов, у которых их ещё нет '
+        '(например, загруженных до появления фоновой обработки)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Пересоздать миниатюры всех рецептов',
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='')
+        if not options['all']:
+            recipes = recipes.filter(image_variants_ready=False)
+        built = failed = 0
+        for recipe_id in recipes.values_list('pk', flat=True).iterator():
+            try:
+                built += build_thumbnails(recipe_id)
+            except OSError as error:
+                failed += 1
+                self.stderr.write(f'Рецепт {recipe_id}: {error}')
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Создано миниатюр: {built}, ошибок: {failed}'
+            )
+        )
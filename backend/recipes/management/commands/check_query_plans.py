@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.query_plans import (explain_cases, get_sample,
+                                 get_seq_scan_pattern, seed)
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет через EXPLAIN, что основные сочетания фильтров '
+        'ленты рецептов используют индексы, а не полный просмотр таблиц'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Сгенерировать N рецептов (изменения откатываются)',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=10,
+            help='Размер страницы в проверяемых запросах',
+        )
+
+    def handle(self, *args, **options):
+        if get_seq_scan_pattern() is None:
+            raise CommandError(
+                f'СУБД {connection.vendor} не поддерживается'
+            )
+        with transaction.atomic():
+            if options['seed']:
+                seed(options['seed'])
+            sample = get_sample()
+            if sample is None:
+                raise CommandError('Нет рецептов: укажите --seed')
+            plans = explain_cases(*sample, options['limit'])
+            transaction.set_rollback(True)
+        failures = []
+        for name, (plan, tables) in plans.items():
+            self.stdout.write(f'--- {name}\n{plan}')
+            if tables:
+                failures.append(f'{name}: {", ".join(tables)}')
+        if failures:
+            raise CommandError(
+                'Полный просмотр таблиц в запросах:\n' + '\n'.join(failures)
+            )
+        self.stdout.write(self.style.SUCCESS('Все запросы используют индексы'))
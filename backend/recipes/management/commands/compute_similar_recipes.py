@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.similarity import refresh_all, refresh_outdated
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает похожие рецепты. По умолчанию — только для '
+        'изменившихся рецептов и их соседей'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Пересчитать списки всех рецептов',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['all']:
+            saved = refresh_all()
+        else:
+            saved = refresh_outdated()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Обновлено рецептов: {saved} '
+                f'за {time.perf_counter() - started:.1f} с'
+            )
+        )
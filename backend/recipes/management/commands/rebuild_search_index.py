@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.search import get_backend, update_search_index
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает полнотекстовый индекс рецептов'
+
+    def handle(self, *args, **options):
+        if get_backend() is None:
+            self.stdout.write('Полнотекстовый индекс для этой СУБД не ведётся')
+            return
+        with transaction.atomic():
+            update_search_index()
+        self.stdout.write(self.style.SUCCESS('Индекс пересобран'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import ShoppingListItem
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает списки покупок пользователей по их корзинам'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help='id пользователя (можно указать несколько раз)',
+        )
+
+    def handle(self, *args, **options):
+        created = ShoppingListItem.objects.rebuild(options['user_ids'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Позиций в списках покупок: {created}')
+        )
@@ -0,0 +1,88 @@
+# Generated by Django 4.2.6 on 2026-10-18 18:38
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Как recipes.feed.BACKFILL_SIZE.
+BACKFILL_SIZE = 100
+
+
+def fill_feeds(apps, schema_editor):
+    """Раскладывает по лентам последние рецепты авторов из уже
+    существующих подписок. Авторы, у которых подписчиков больше
+    FEED_FANOUT_LIMIT, попадают в PopularAuthor, как в recipes.feed."""
+    FeedEntry = apps.get_model('recipes', 'FeedEntry')
+    PopularAuthor = apps.get_model('recipes', 'PopularAuthor')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Subscription = apps.get_model('users', 'Subscription')
+    authors = Subscription.objects.values('author').annotate(
+        subscribers=models.Count('id')
+    ).order_by()
+    for row in authors.iterator():
+        author_id = row['author']
+        if row['subscribers'] > settings.FEED_FANOUT_LIMIT:
+            PopularAuthor.objects.get_or_create(author_id=author_id)
+            continue
+        recipes = list(
+            Recipe.objects.filter(author_id=author_id)
+            .order_by('-created_at')
+            .values_list('pk', 'created_at')[:BACKFILL_SIZE]
+        )
+        if not recipes:
+            continue
+        FeedEntry.objects.bulk_create(
+            (
+                FeedEntry(
+                    user_id=user_id, recipe_id=pk, created_at=created_at
+                )
+                for user_id in Subscription.objects.filter(
+                    author_id=author_id
+                ).values_list('user_id', flat=True).iterator()
+                for pk, created_at in recipes
+            ),
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0010_recipe_similarity'),
+        ('users', '0002_alter_subscription_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PopularAuthor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+            ],
+            options={
+                'verbose_name': 'Популярный автор',
+                'verbose_name_plural': 'Популярные авторы',
+            },
+        ),
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(verbose_name='Дата создания рецепта')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Лента подписок',
+                'indexes': [models.Index(fields=['user', '-created_at', '-recipe'], name='feed_entry_user_created_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_user_recipe_feed'),
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,5 @@
+from django.db import connection, transaction
+from django.db.models import F
 from django.shortcuts import get_object_or_404
 from rest_framework import authentication, permissions, status
 from rest_framework.response import Response
@@ -9,38 +11,49 @@ from .models import Recipe
 class RecipeActionMixin(APIView):
     authentication_classes = (authentication.TokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
+    counter_field = None
 
+    @transaction.atomic
     def perform_recipe_action(
-            self, request, pk: int, action_fn, model_class, error_message):
-        user = request.user
-        recipe = get_object_or_404(Recipe, pk=pk)
-
-        if not action_fn(user, recipe, model_class):
+            self, request, pk: int, action_fn, model_class, error_message,
+            counter_delta=0):
+        if not action_fn(request.user, pk, model_class):
+            # Ни одна строка не изменилась: либо рецепта нет, либо он уже
+            # в списке (или отсутствует в нём). Различаем только здесь.
+            get_object_or_404(Recipe, pk=pk)
             return Response(
-                {'error': error_message.format(pk)},
+                {'error': error_message},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        if self.counter_field and counter_delta:
+            Recipe.objects.filter(pk=pk).update(**{
+                self.counter_field: F(self.counter_field) + counter_delta
+            })
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @staticmethod
-    def add_to_list(user, recipe, model_class):
-        if model_class.objects.filter(
-            user=user, recipe=recipe
-        ).exists():
-            return Response(
-                status=status.HTTP_400_BAD_REQUEST,
+    def add_to_list(user, recipe_id, model_class):
+        """Добавляет рецепт одним INSERT ... ON CONFLICT DO NOTHING.
+
+        Повторное добавление отсекается уникальным ограничением
+        (user, recipe), несуществующий рецепт — подзапросом SELECT.
+        """
+        quote_name = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {quote_name(model_class._meta.db_table)} '
+                f'(user_id, recipe_id) '
+                f'SELECT %s, id FROM {quote_name(Recipe._meta.db_table)} '
+                f'WHERE id = %s '
+                f'ON CONFLICT DO NOTHING RETURNING id',
+                [user.id, recipe_id],
             )
-        model_class.objects.create(user=user, recipe=recipe)
-        return Response(status=status.HTTP_204_NO_CONTENT)
+            return cursor.fetchone() is not None
 
     @staticmethod
-    def remove_from_list(user, recipe, model_class):
-        if not model_class.objects.filter(
-            user=user, recipe=recipe
-        ).exists():
-            return Response(
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        model_class.objects.filter(user=user, recipe=recipe).delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
+    def remove_from_list(user, recipe_id, model_class):
+        deleted, _ = model_class.objects.filter(
+            user=user, recipe_id=recipe_id
+        ).delete()
+        return bool(deleted)
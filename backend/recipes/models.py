@@ -1,9 +1,93 @@
+from itertools import islice
+
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import (Count, Exists, F, OuterRef, Prefetch, Subquery,
+                              Sum, Value, Window)
+from django.db.models.functions import Coalesce, RowNumber
 
 from ingredients.models import Ingredient
 from tags.models import Tag
+from users.models import Subscription, with_is_subscribed
+
+
+class RecipeQuerySet(models.QuerySet):
+    def with_user_flags(self, user):
+        """Аннотирует рецепты флагами избранного и списка покупок."""
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False),
+            )
+        return self.annotate(
+            is_favorited=Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+        )
+
+    def with_author_subscribed(self, user):
+        """Аннотирует рецепты флагом подписки пользователя на автора."""
+        if not user.is_authenticated:
+            return self.annotate(author_is_subscribed=Value(False))
+        return self.annotate(
+            author_is_subscribed=Exists(
+                Subscription.objects.filter(
+                    user=user, author=OuterRef('author_id')
+                )
+            )
+        )
+
+    def with_related(self, user):
+        """Подгружает автора, теги и ингредиенты фиксированным числом
+        запросов независимо от количества рецептов."""
+        return self.prefetch_related(
+            Prefetch(
+                'author',
+                queryset=with_is_subscribed(User.objects.all(), user),
+            ),
+            Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related('ingredient'),
+            ),
+            'tags',
+        )
+
+    def reconcile_counters(self):
+        """Пересчитывает счётчики избранного и списков покупок."""
+        return self.update(
+            favorites_count=self._count_subquery(Favorite),
+            carts_count=self._count_subquery(ShoppingCart),
+        )
+
+    @staticmethod
+    def _count_subquery(model):
+        return Coalesce(
+            Subquery(
+                model.objects.filter(recipe=OuterRef('pk'))
+                .values('recipe')
+                .annotate(count=Count('pk'))
+                .values('count')
+            ),
+            0,
+        )
+
+    def latest_by_author(self, author_ids, limit=None):
+        """Возвращает последние рецепты авторов одним оконным запросом,
+        не более limit на каждого автора."""
+        queryset = self.filter(author_id__in=author_ids)
+        if limit is None:
+            return queryset
+        return queryset.annotate(
+            row_number=Window(
+                RowNumber(),
+                partition_by=F('author_id'),
+                order_by=F('created_at').desc(),
+            )
+        ).filter(row_number__lte=limit)
 
 
 class Recipe(models.Model):
@@ -40,6 +124,16 @@ class Recipe(models.Model):
         verbose_name='Изображение рецепта',
         help_text='Загрузите изображение для рецепта',
     )
+    image_variants_ready = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Миниатюры готовы',
+    )
+    similar_outdated = models.BooleanField(
+        default=True,
+        editable=False,
+        verbose_name='Похожие рецепты устарели',
+    )
     cooking_time = models.PositiveIntegerField(
         verbose_name='Время приготовления (в минутах)',
         help_text='Укажите время приготовления в минутах',
@@ -48,11 +142,42 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name='Дата создания',
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В избранном',
+    )
+    carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В списках покупок',
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ('-created_at',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='recipe_feed_idx',
+            ),
+            models.Index(
+                fields=['author', '-created_at'],
+                name='recipe_author_created_idx',
+            ),
+            models.Index(
+                fields=['-favorites_count', '-created_at'],
+                name='recipe_popularity_idx',
+            ),
+            models.Index(
+                fields=['id'],
+                condition=models.Q(similar_outdated=True),
+                name='recipe_similar_outdated_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -170,3 +295,225 @@ class Favorite(models.Model):
 
     def __str__(self):
         return f'{self.user.username} - {self.recipe.name}'
+
+
+class RecipeSimilarity(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similarities',
+        verbose_name='Рецепт',
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожий рецепт',
+    )
+    score = models.FloatField(verbose_name='Сходство')
+
+    class Meta:
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'],
+                name='unique_recipe_similarity'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['recipe', '-score'],
+                name='recipe_similarity_score_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} ~ {self.similar} ({self.score:.2f})'
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Подписчик',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Рецепт',
+    )
+    created_at = models.DateTimeField(verbose_name='Дата создания рецепта')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_user_recipe_feed'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-created_at', '-recipe'],
+                name='feed_entry_user_created_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'Лента {self.user} --> {self.recipe}'
+
+
+class PopularAuthor(models.Model):
+    """Автор, чьи рецепты не раскладываются по лентам подписчиков, а
+    подмешиваются в ленту при чтении."""
+
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+
+    class Meta:
+        verbose_name = 'Популярный автор'
+        verbose_name_plural = 'Популярные авторы'
+
+    def __str__(self):
+        return str(self.author)
+
+
+class ShoppingListItemQuerySet(models.QuerySet):
+    rebuild_batch_size = 1000
+    add_attempts = 3
+
+    def add_amounts(self, user_ids, amounts):
+        """Прибавляет количества ингредиентов к спискам покупок
+        пользователей. Отрицательные значения уменьшают количество,
+        обнулившиеся позиции удаляются."""
+        if not user_ids or not amounts:
+            return
+        # select_for_update() блокирует только существующие позиции. Если
+        # параллельная транзакция вставила ту же новую позицию раньше,
+        # вставка нарушит уникальность, и повтор прибавит количество уже
+        # к её строке.
+        for attempt in range(1, self.add_attempts + 1):
+            try:
+                with transaction.atomic():
+                    self.apply_amounts(user_ids, amounts)
+                return
+            except IntegrityError:
+                if attempt == self.add_attempts:
+                    raise
+
+    def apply_amounts(self, user_ids, amounts):
+        """Одна попытка add_amounts(); вызывается внутри транзакции."""
+        existing = {
+            (item.user_id, item.ingredient_id): item
+            for item in self.select_for_update().filter(
+                user_id__in=user_ids, ingredient_id__in=amounts
+            )
+        }
+        to_create, to_update, to_delete = [], [], []
+        for user_id in user_ids:
+            for ingredient_id, amount in amounts.items():
+                item = existing.get((user_id, ingredient_id))
+                if item is None:
+                    if amount > 0:
+                        to_create.append(self.model(
+                            user_id=user_id,
+                            ingredient_id=ingredient_id,
+                            total_amount=amount,
+                        ))
+                    continue
+                item.total_amount += amount
+                if item.total_amount > 0:
+                    to_update.append(item)
+                else:
+                    to_delete.append(item.pk)
+        if to_delete:
+            self.filter(pk__in=to_delete).delete()
+        if to_update:
+            self.bulk_update(to_update, ['total_amount'])
+        if to_create:
+            self.bulk_create(to_create)
+
+    def add_recipe(self, user_ids, recipe_id, sign=1):
+        """Добавляет (sign=1) или вычитает (sign=-1) ингредиенты рецепта."""
+        amounts = {
+            ingredient_id: sign * amount
+            for ingredient_id, amount in RecipeIngredient.objects.filter(
+                recipe_id=recipe_id
+            ).values_list('ingredient_id', 'amount')
+        }
+        self.add_amounts(user_ids, amounts)
+
+    def remove_recipe(self, user_ids, recipe_id):
+        self.add_recipe(user_ids, recipe_id, sign=-1)
+
+    def rebuild(self, user_ids=None):
+        """Пересчитывает списки покупок по содержимому корзин."""
+        items = self.all()
+        carts_lookup = {'recipe__carts__isnull': False}
+        if user_ids is not None:
+            items = items.filter(user_id__in=user_ids)
+            carts_lookup = {'recipe__carts__user__in': user_ids}
+        totals = RecipeIngredient.objects.filter(**carts_lookup).values(
+            'recipe__carts__user', 'ingredient'
+        ).annotate(total=Sum('amount')).order_by()
+        created = 0
+        with transaction.atomic():
+            items.delete()
+            rows = totals.iterator(chunk_size=self.rebuild_batch_size)
+            while batch := [
+                self.model(
+                    user_id=row['recipe__carts__user'],
+                    ingredient_id=row['ingredient'],
+                    total_amount=row['total'],
+                )
+                for row in islice(rows, self.rebuild_batch_size)
+            ]:
+                self.bulk_create(batch)
+                created += len(batch)
+        return created
+
+
+class ShoppingListItem(models.Model):
+    """Агрегированный список покупок пользователя.
+
+    Поддерживается при добавлении и удалении рецептов из корзины,
+    чтобы выгрузка списка не пересчитывала сумму по всем рецептам.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Пользователь',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент',
+    )
+    total_amount = models.PositiveIntegerField(
+        verbose_name='Общее количество',
+    )
+
+    objects = ShoppingListItemQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Список покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_user_shopping_list_ingredient'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user} --> {self.ingredient}: {self.total_amount}'
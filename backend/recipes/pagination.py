@@ -1,7 +1,87 @@
-from rest_framework.pagination import PageNumberPagination
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (Cursor, CursorPagination,
+                                       PageNumberPagination)
+from rest_framework.response import Response
 
 
 class CustomPageNumberPagination(PageNumberPagination):
     page_size_query_param = 'limit'
     max_page_size = 1000
     recipes_limit_query_param = 'recipes_limit'
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Асинхронный вариант paginate_queryset(): количество и
+        страница читаются через асинхронный ORM."""
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            ))
+        self.page.object_list = [
+            item async for item in self.page.object_list
+        ]
+        self.request = request
+        return self.page.object_list
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Постраничный вывод по курсору для бесконечной ленты.
+
+    Страница выбирается условием по (-created_at, -id) без OFFSET и без
+    подсчёта общего количества записей.
+    """
+
+    page_size = 10
+    page_size_query_param = 'limit'
+    max_page_size = 1000
+    ordering = ('-created_at', '-id')
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        # Страница и признаки соседних страниц вычисляются одним
+        # запросом, который в асинхронном ORM всё равно ушёл бы в поток.
+        return await sync_to_async(self.paginate_queryset)(
+            queryset, request, view
+        )
+
+
+class FeedPagination(CursorPagination):
+    """Курсор ленты подписок: позиция — (created_at, id) последнего
+    рецепта страницы, саму страницу собирает recipes.feed.read_feed."""
+
+    page_size = 10
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+    def get_position(self, request):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        cursor = self.decode_cursor(request)
+        if cursor is None or cursor.position is None:
+            return None
+        try:
+            created_at, recipe_id = cursor.position.rsplit('|', 1)
+            return datetime.fromisoformat(created_at), int(recipe_id)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_paginated_response(self, data, next_position=None):
+        next_link = None
+        if next_position is not None:
+            created_at, recipe_id = next_position
+            next_link = self.encode_cursor(Cursor(
+                offset=0,
+                reverse=False,
+                position=f'{created_at.isoformat()}|{recipe_id}',
+            ))
+        return Response({'next': next_link, 'results': data})
@@ -0,0 +1,101 @@
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.http.multipartparser import MultiPartParser as DjangoParser
+from django.http.multipartparser import MultiPartParserError
+from django.template.defaultfilters import filesizeformat
+from rest_framework.exceptions import ParseError, ValidationError
+from rest_framework.parsers import DataAndFiles, MultiPartParser
+
+# Сигнатуры в начале файла: (смещение, байты).
+IMAGE_SIGNATURES = (
+    ((0, b'\x89PNG\r\n\x1a\n'),),
+    ((0, b'\xff\xd8\xff'),),
+    ((0, b'GIF87a'),),
+    ((0, b'GIF89a'),),
+    ((0, b'RIFF'), (8, b'WEBP')),
+)
+HEADER_SIZE = 12
+# Запас на заголовки частей и текстовые поля формы.
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def is_image_header(header):
+    return any(
+        all(
+            header[offset:offset + len(magic)] == magic
+            for offset, magic in signature
+        )
+        for signature in IMAGE_SIGNATURES
+    )
+
+
+class RecipeImageUploadHandler(TemporaryFileUploadHandler):
+    """Пишет загружаемое изображение во временный файл по частям.
+
+    Размер и сигнатура файла проверяются по мере получения данных,
+    поэтому слишком большой или не графический файл отклоняется, не
+    дочитываясь до конца.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_size = settings.RECIPE_IMAGE_MAX_SIZE
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        limit = self.max_size + MULTIPART_OVERHEAD
+        if content_length and content_length > limit:
+            self.reject_size()
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.header = b''
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_size:
+            self.reject_size()
+        if len(self.header) < HEADER_SIZE:
+            self.header += raw_data[:HEADER_SIZE - len(self.header)]
+            if len(self.header) == HEADER_SIZE:
+                self.check_header()
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        if len(self.header) < HEADER_SIZE:
+            self.check_header()
+        return super().file_complete(file_size)
+
+    def check_header(self):
+        if not is_image_header(self.header):
+            self.reject('Поддерживаются изображения PNG, JPEG, GIF и WebP.')
+
+    def reject_size(self):
+        self.reject(
+            f'Размер изображения не должен превышать '
+            f'{filesizeformat(self.max_size)}.'
+        )
+
+    def reject(self, message):
+        # До new_file() имя поля ещё неизвестно.
+        field_name = getattr(self, 'field_name', None) or 'image'
+        raise ValidationError({field_name: [message]})
+
+
+class RecipeImageParser(MultiPartParser):
+    """multipart/form-data с потоковой загрузкой изображения рецепта
+    через RecipeImageUploadHandler вместо обработчиков по умолчанию."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        request = parser_context['request']
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        meta = request.META.copy()
+        meta['CONTENT_TYPE'] = media_type
+        try:
+            parser = DjangoParser(
+                meta, stream, [RecipeImageUploadHandler(request)], encoding
+            )
+            data, files = parser.parse()
+            return DataAndFiles(data, files)
+        except MultiPartParserError as exc:
+            raise ParseError(f'Ошибка разбора multipart: {exc}')
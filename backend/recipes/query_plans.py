@@ -0,0 +1,119 @@
+"""Проверка планов запросов ленты рецептов.
+
+Для основных сочетаний фильтров RecipeFilter строится EXPLAIN первой
+страницы ленты и ищутся полные просмотры таблиц. Используется тестами
+и командой check_query_plans.
+"""
+import re
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+from recipes.filters import RecipeFilter
+from recipes.models import Favorite, Recipe, ShoppingCart
+from recipes.views import RecipeViewSet
+from tags.models import Tag
+
+User = get_user_model()
+
+SEQ_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(r'\bSCAN (\w+)\b(?! USING)'),
+}
+
+
+def get_seq_scan_pattern():
+    """Регулярное выражение полного просмотра для текущей СУБД или
+    None, если СУБД не поддерживается."""
+    return SEQ_SCAN_PATTERNS.get(connection.vendor)
+
+
+def seed(count, users_count=20):
+    """Создаёт count рецептов с тегами, избранным и списками покупок."""
+    users = User.objects.bulk_create(
+        User(
+            username=f'query_plan_{number}',
+            email=f'query_plan_{number}@example.com',
+        )
+        for number in range(users_count)
+    )
+    tags = [
+        Tag.objects.create(
+            name=f'query_plan_{number}',
+            slug=f'query_plan_{number}',
+            color='#000000',
+        )
+        for number in range(3)
+    ]
+    recipes = Recipe.objects.bulk_create(
+        Recipe(
+            author=users[number % users_count],
+            name=f'Рецепт {number}',
+            text='-',
+            image='recipes_images/seed.png',
+            cooking_time=1,
+        )
+        for number in range(count)
+    )
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe=recipe, tag=tags[number % len(tags)])
+        for number, recipe in enumerate(recipes)
+    )
+    Favorite.objects.bulk_create(
+        Favorite(user=users[number % users_count], recipe=recipe)
+        for number, recipe in enumerate(recipes[::3])
+    )
+    ShoppingCart.objects.bulk_create(
+        ShoppingCart(user=users[number % users_count], recipe=recipe)
+        for number, recipe in enumerate(recipes[::5])
+    )
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def get_sample():
+    """Пользователь, слаги тегов и автор для подстановки в фильтры или
+    None, если рецептов нет."""
+    recipe = Recipe.objects.order_by('?').first()
+    if recipe is None:
+        return None
+    user = (
+        User.objects.filter(favorites__isnull=False).first()
+        or User.objects.first()
+    )
+    tags = list(Tag.objects.values_list('slug', flat=True)[:2])
+    return user, tags, recipe.author_id
+
+
+def get_cases(tags, author_id):
+    return {
+        'лента': {},
+        'автор': {'author': author_id},
+        'один тег': {'tags': tags[:1]},
+        'несколько тегов': {'tags': tags},
+        'избранное': {'is_favorited': 1},
+        'список покупок': {'is_in_shopping_cart': 1},
+        'автор и теги': {'author': author_id, 'tags': tags},
+        'избранное и теги': {'is_favorited': 1, 'tags': tags},
+    }
+
+
+def explain_cases(user, tags, author_id, limit):
+    """Возвращает словарь {название сочетания: (план, таблицы,
+    просматриваемые целиком)}."""
+    pattern = get_seq_scan_pattern()
+    if connection.vendor == 'postgresql':
+        # Без этого на маленьких таблицах планировщик предпочитает
+        # полный просмотр даже при подходящем индексе.
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+    request = SimpleNamespace(user=user)
+    plans = {}
+    for name, params in get_cases(tags, author_id).items():
+        queryset = RecipeFilter(
+            params, queryset=Recipe.objects.all(), request=request
+        ).qs.order_by(*RecipeViewSet.ordering)[:limit]
+        plan = queryset.explain()
+        plans[name] = (plan, sorted(set(pattern.findall(plan))))
+    return plans
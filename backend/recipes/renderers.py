@@ -0,0 +1,174 @@
+import csv
+import os
+from functools import partial
+from tempfile import SpooledTemporaryFile
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from rest_framework.renderers import BaseRenderer
+
+HEADER = ('Ингредиент', 'Количество', 'Единица измерения')
+# Сколько строк списка обрабатывается за один переход в поток.
+THREAD_BATCH_SIZE = 500
+
+
+class Echo:
+    """Псевдо-буфер: вместо записи возвращает переданную строку."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """Базовый рендерер списка покупок.
+
+    Сам список отдаётся потоком через stream(), а render() нужен DRF
+    только для ответов с ошибками.
+    """
+
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict):
+            data = '\n'.join(f'{key}: {value}' for key, value in data.items())
+        return str(data).encode('utf-8')
+
+    def stream(self, ingredients):
+        raise NotImplementedError
+
+    def astream(self, ingredients):
+        """Асинхронный вариант stream(): ingredients — асинхронный
+        итератор."""
+        raise NotImplementedError
+
+
+class LineShoppingListRenderer(ShoppingListRenderer):
+    """Текстовый список покупок: заголовок и по строке на ингредиент."""
+
+    def header(self):
+        raise NotImplementedError
+
+    def line(self, ingredient):
+        raise NotImplementedError
+
+    def stream(self, ingredients):
+        yield self.header()
+        for ingredient in ingredients:
+            yield self.line(ingredient)
+
+    async def astream(self, ingredients):
+        yield self.header()
+        async for ingredient in ingredients:
+            yield self.line(ingredient)
+
+
+class CSVShoppingListRenderer(LineShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    writer = csv.writer(Echo())
+
+    def header(self):
+        return self.writer.writerow(HEADER)
+
+    def line(self, ingredient):
+        return self.writer.writerow((
+            ingredient['ingredient__name'],
+            ingredient['total_amount'],
+            ingredient['ingredient__measurement_unit'],
+        ))
+
+
+class TXTShoppingListRenderer(LineShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def header(self):
+        return 'Список покупок\n\n'
+
+    def line(self, ingredient):
+        return (
+            f'{ingredient["ingredient__name"]} '
+            f'({ingredient["ingredient__measurement_unit"]}) — '
+            f'{ingredient["total_amount"]}\n'
+        )
+
+
+class PDFShoppingListRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    chunk_size = 64 * 1024
+    font_name = 'ShoppingListFont'
+    font_size = 12
+    line_height = 18
+    margin = 50
+
+    def get_font(self):
+        font_path = settings.SHOPPING_LIST_PDF_FONT
+        if not os.path.exists(font_path):
+            return 'Helvetica'
+        if self.font_name not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(TTFont(self.font_name, font_path))
+        return self.font_name
+
+    def start(self, buffer):
+        pdf = canvas.Canvas(buffer, pagesize=A4)
+        pdf.setTitle('Список покупок')
+        pdf.setFont(self.get_font(), self.font_size)
+        pdf.drawString(self.margin, A4[1] - self.margin, 'Список покупок')
+        return pdf, A4[1] - self.margin - self.line_height * 2
+
+    def draw(self, pdf, y, ingredients):
+        """Выводит строки списка, начиная с высоты y, и возвращает
+        высоту следующей строки."""
+        font = self.get_font()
+        for ingredient in ingredients:
+            if y < self.margin:
+                pdf.showPage()
+                pdf.setFont(font, self.font_size)
+                y = A4[1] - self.margin
+            pdf.drawString(
+                self.margin,
+                y,
+                f'{ingredient["ingredient__name"]} '
+                f'({ingredient["ingredient__measurement_unit"]}) — '
+                f'{ingredient["total_amount"]}',
+            )
+            y -= self.line_height
+        return y
+
+    def stream(self, ingredients):
+        # Страницы формируются по мере чтения строк из курсора, а готовый
+        # файл держится в памяти только до chunk_size, остальное уходит
+        # во временный файл на диске.
+        with SpooledTemporaryFile(max_size=self.chunk_size) as buffer:
+            pdf, y = self.start(buffer)
+            self.draw(pdf, y, ingredients)
+            pdf.save()
+            buffer.seek(0)
+            while chunk := buffer.read(self.chunk_size):
+                yield chunk
+
+    async def astream(self, ingredients):
+        # Файл собирается в потоке, чтобы не занимать цикл событий. Строки
+        # передаются туда пачками по мере чтения из курсора.
+        in_thread = partial(sync_to_async, thread_sensitive=False)
+        with SpooledTemporaryFile(max_size=self.chunk_size) as buffer:
+            pdf, y = await in_thread(self.start)(buffer)
+            batch = []
+            async for ingredient in ingredients:
+                batch.append(ingredient)
+                if len(batch) == THREAD_BATCH_SIZE:
+                    y = await in_thread(self.draw)(pdf, y, batch)
+                    batch = []
+            await in_thread(self.draw)(pdf, y, batch)
+            await in_thread(pdf.save)()
+            buffer.seek(0)
+            while chunk := await in_thread(buffer.read)(self.chunk_size):
+                yield chunk
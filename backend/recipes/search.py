@@ -0,0 +1,147 @@
+"""Полнотекстовый поиск рецептов по названию, описанию и ингредиентам.
+
+В PostgreSQL документ хранится в столбце recipes_recipe.search_vector
+(tsvector с GIN-индексом), в SQLite — в виртуальной таблице FTS5
+recipes_recipe_fts с rowid, равным id рецепта. Оба создаются миграцией
+0009_recipe_search, а обновляются сигналами после фиксации транзакции.
+"""
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+TEXT_SEARCH_CONFIG = 'russian'
+FTS_TABLE = 'recipes_recipe_fts'
+MAX_TERMS = 10
+INDEX_BATCH_SIZE = 500
+
+
+def get_terms(query):
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+class PostgreSQLSearch:
+    # Вес A — название, B — ингредиенты, C — описание.
+    update_sql = """
+        UPDATE recipes_recipe AS recipe SET search_vector =
+            setweight(to_tsvector(%(config)s, recipe.name), 'A')
+            || setweight(to_tsvector(%(config)s, coalesce((
+                SELECT string_agg(ingredient.name, ' ')
+                FROM recipes_recipeingredient AS recipe_ingredient
+                JOIN ingredients_ingredient AS ingredient
+                    ON ingredient.id = recipe_ingredient.ingredient_id
+                WHERE recipe_ingredient.recipe_id = recipe.id
+            ), '')), 'B')
+            || setweight(to_tsvector(%(config)s, recipe.text), 'C')
+    """
+
+    def update_index(self, cursor, recipe_ids):
+        params = {'config': TEXT_SEARCH_CONFIG}
+        sql = self.update_sql
+        if recipe_ids is not None:
+            sql += ' WHERE recipe.id = ANY(%(ids)s)'
+            params['ids'] = list(recipe_ids)
+        cursor.execute(sql, params)
+
+    def search(self, queryset, terms):
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        params = (TEXT_SEARCH_CONFIG, tsquery)
+        return queryset.filter(RawSQL(
+            '"recipes_recipe"."search_vector" @@ to_tsquery(%s, %s)',
+            params,
+            output_field=BooleanField(),
+        )).annotate(search_rank=RawSQL(
+            'ts_rank_cd("recipes_recipe"."search_vector", '
+            'to_tsquery(%s, %s))',
+            params,
+            output_field=FloatField(),
+        ))
+
+
+class SQLiteSearch:
+    insert_sql = f"""
+        INSERT INTO {FTS_TABLE} (rowid, name, text, ingredients)
+        SELECT recipe.id, recipe.name, recipe.text, coalesce((
+            SELECT group_concat(ingredient.name, ' ')
+            FROM recipes_recipeingredient AS recipe_ingredient
+            JOIN ingredients_ingredient AS ingredient
+                ON ingredient.id = recipe_ingredient.ingredient_id
+            WHERE recipe_ingredient.recipe_id = recipe.id
+        ), '')
+        FROM recipes_recipe AS recipe
+    """
+
+    def update_index(self, cursor, recipe_ids):
+        if recipe_ids is None:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(self.insert_sql)
+            return
+        recipe_ids = list(recipe_ids)
+        for start in range(0, len(recipe_ids), INDEX_BATCH_SIZE):
+            batch = recipe_ids[start:start + INDEX_BATCH_SIZE]
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})',
+                batch,
+            )
+            cursor.execute(
+                f'{self.insert_sql} WHERE recipe.id IN ({placeholders})',
+                batch,
+            )
+
+    def search(self, queryset, terms):
+        # Каждое слово ищется как префикс, слова объединяются через AND.
+        fts_query = ' '.join(f'"{term}"*' for term in terms)
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            (fts_query,),
+        )).annotate(search_rank=RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, 10.0, 1.0, 5.0) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s '
+            f'AND rowid = "recipes_recipe"."id"',
+            (fts_query,),
+            output_field=FloatField(),
+        ))
+
+
+BACKENDS = {
+    'postgresql': PostgreSQLSearch,
+    'sqlite': SQLiteSearch,
+}
+
+
+def get_backend():
+    backend = BACKENDS.get(connection.vendor)
+    return backend() if backend else None
+
+
+def search_recipes(queryset, query):
+    """Оставляет рецепты, подходящие под запрос, и добавляет аннотацию
+    search_rank (чем больше, тем релевантнее)."""
+    terms = get_terms(query)
+    if not terms:
+        return queryset.annotate(search_rank=Value(0.0)).none()
+    backend = get_backend()
+    if backend is not None:
+        return backend.search(queryset, terms)
+    condition = Q()
+    for term in terms:
+        condition &= (
+            Q(name__icontains=term)
+            | Q(text__icontains=term)
+            | Q(ingredients__name__icontains=term)
+        )
+    return queryset.filter(
+        pk__in=queryset.model.objects.filter(condition).values('pk')
+    ).annotate(search_rank=Value(0.0))
+
+
+def update_search_index(recipe_ids=None):
+    """Пересобирает поисковые документы рецептов (всех, если recipe_ids
+    не указаны). Документы удалённых рецептов удаляются."""
+    backend = get_backend()
+    if backend is None:
+        return
+    with connection.cursor() as cursor:
+        backend.update_index(cursor, recipe_ids)
@@ -1,19 +1,26 @@
 from django.core.validators import MinValueValidator
+from django.db import transaction
 from django.db.models import ImageField
 from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
 from rest_framework import serializers
 
 from ingredients.models import Ingredient
-from recipes.models import Favorite, Recipe, RecipeIngredient, ShoppingCart
+from ingredients.serializers import IngredientField
+from recipes.fields import BulkPrimaryKeyRelatedField
+from recipes.images import (build_thumbnail_urls,
+                            schedule_thumbnails_cleanup)
+from recipes.models import (Favorite, Recipe, RecipeIngredient, ShoppingCart,
+                            ShoppingListItem)
 from tags.models import Tag
 from tags.serializers import TagSerializer
 from users.serializers import CustomUserSerializer
 
 
 class CreateRecipeIngredientSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(), source='ingredient'
-    )
+    # Ингредиенты находятся все сразу в
+    # RecipeCreateSerializer.validate_ingredients().
+    id = serializers.IntegerField()
 
     class Meta:
         model = RecipeIngredient
@@ -49,12 +56,16 @@ class BaseRecipeSerializer(serializers.ModelSerializer):
     is_in_shopping_cart = serializers.SerializerMethodField()
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context['request'].user
         if user.is_authenticated:
             return Favorite.objects.filter(user=user, recipe=obj).exists()
         return False
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context['request'].user
         if user.is_authenticated:
             return ShoppingCart.objects.filter(user=user, recipe=obj).exists()
@@ -68,15 +79,19 @@ class RecipeSerializer(BaseRecipeSerializer):
         many=True, required=True, source='recipe_ingredients'
     )
     image = ImageField()
+    thumbnail = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
-        fields = '__all__'
+        exclude = ('image_variants_ready', 'similar_outdated')
+
+    def get_thumbnail(self, obj):
+        return build_thumbnail_urls(self.context.get('request'), obj)
 
 
 class RecipeCreateSerializer(BaseRecipeSerializer):
     author = CustomUserSerializer(read_only=True)
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = BulkPrimaryKeyRelatedField(
         queryset=Tag.objects.all(),
         many=True
     )
@@ -87,17 +102,21 @@ class RecipeCreateSerializer(BaseRecipeSerializer):
 
     class Meta:
         model = Recipe
-        fields = '__all__'
+        exclude = ('image_variants_ready', 'similar_outdated')
 
     def validate_ingredients(self, value):
-        seen_ingredients = set()
-        for ingredient in value:
-            ingredient_id = ingredient['ingredient'].id
-            if ingredient_id in seen_ingredients:
-                raise serializers.ValidationError(
-                    'Ингредиенты не должны повторяться в рецепте.'
-                )
-            seen_ingredients.add(ingredient_id)
+        ingredient_ids = [ingredient.pop('id') for ingredient in value]
+        if len(set(ingredient_ids)) < len(ingredient_ids):
+            raise serializers.ValidationError(
+                'Ингредиенты не должны повторяться в рецепте.'
+            )
+        # Одно обращение к справочнику и не больше одного запроса id__in
+        # на весь рецепт, а не на каждый ингредиент.
+        found = IngredientField(
+            queryset=Ingredient.objects.all()
+        ).resolve_all(ingredient_ids)
+        for ingredient, obj in zip(value, found):
+            ingredient['ingredient'] = obj
         return value
 
     def create_ingredients(self, recipe, ingredients):
@@ -111,40 +130,155 @@ class RecipeCreateSerializer(BaseRecipeSerializer):
         ]
         RecipeIngredient.objects.bulk_create(recipe_ingredients)
 
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('recipe_ingredients')
 
         recipe = Recipe.objects.create(**validated_data)
-        recipe.tags.set(tags)
+        through = Recipe.tags.through
+        through.objects.bulk_create(
+            through(recipe=recipe, tag=tag) for tag in dict.fromkeys(tags)
+        )
 
         self.create_ingredients(recipe, ingredients)
 
         return recipe
 
+    def update_tags(self, instance, tags):
+        """Добавляет и удаляет только изменившиеся связи с тегами.
+        Возвращает True, если набор тегов изменился."""
+        current = {tag.id for tag in instance.tags.all()}
+        incoming = {tag.id for tag in tags}
+        through = Recipe.tags.through
+        removed = current - incoming
+        if removed:
+            through.objects.filter(
+                recipe=instance, tag_id__in=removed
+            ).delete()
+        added = incoming - current
+        if added:
+            through.objects.bulk_create(
+                through(recipe=instance, tag_id=tag_id) for tag_id in added
+            )
+        return bool(removed or added)
+
+    def update_ingredients(self, instance, ingredients):
+        """Сравнивает текущие ингредиенты рецепта с новыми и выполняет
+        только нужные INSERT, UPDATE и DELETE.
+
+        Списки покупок пользователей, у которых рецепт в корзине,
+        корректируются на разницу количеств. Возвращает True, если
+        изменился набор ингредиентов.
+        """
+        current = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in instance.recipe_ingredients.all()
+        }
+        incoming = {
+            ingredient['ingredient'].id: ingredient
+            for ingredient in ingredients
+        }
+        deltas = {}
+        to_delete, to_update, to_create = [], [], []
+        for ingredient_id, recipe_ingredient in current.items():
+            if ingredient_id not in incoming:
+                to_delete.append(recipe_ingredient.pk)
+                deltas[ingredient_id] = -recipe_ingredient.amount
+                continue
+            amount = incoming[ingredient_id]['amount']
+            if amount != recipe_ingredient.amount:
+                deltas[ingredient_id] = amount - recipe_ingredient.amount
+                recipe_ingredient.amount = amount
+                to_update.append(recipe_ingredient)
+        for ingredient_id, ingredient in incoming.items():
+            if ingredient_id not in current:
+                to_create.append(ingredient)
+                deltas[ingredient_id] = ingredient['amount']
+
+        if to_delete:
+            RecipeIngredient.objects.filter(pk__in=to_delete).delete()
+        if to_update:
+            RecipeIngredient.objects.bulk_update(to_update, ['amount'])
+        if to_create:
+            self.create_ingredients(instance, to_create)
+        if deltas:
+            ShoppingListItem.objects.add_amounts(
+                list(instance.carts.values_list('user_id', flat=True)),
+                deltas,
+            )
+        return bool(to_delete or to_create)
+
+    @transaction.atomic
     def update(self, instance, validated_data):
-        tags = validated_data.get('tags')
-        if tags is not None:
-            instance.tags.set(tags)
+        # Массовые операции не отправляют сигналы, кэш рецепта сбрасывает
+        # сохранение самого рецепта в super().update().
+        if 'image' in validated_data:
+            validated_data['image_variants_ready'] = False
+            if instance.image:
+                schedule_thumbnails_cleanup(instance.image.name)
+
+        # Похожие рецепты подбираются по тегам и ингредиентам, поэтому
+        # пересчитываются только после изменения их набора.
+        tags = validated_data.pop('tags', None)
+        if tags is not None and self.update_tags(instance, tags):
+            validated_data['similar_outdated'] = True
+
+        ingredients = validated_data.pop('recipe_ingredients', None)
+        if ingredients is not None and self.update_ingredients(
+            instance, ingredients
+        ):
+            validated_data['similar_outdated'] = True
 
-        ingredients_data = validated_data.get('ingredients')
-        if ingredients_data is not None:
-            instance.ingredients.clear()
-            self.create_ingredients(instance, ingredients_data)
+        return super().update(instance, validated_data)
 
-        super().update(instance, validated_data)
 
-        return instance
+class RecipeImageSerializer(serializers.ModelSerializer):
+    """Замена изображения рецепта файлом из multipart/form-data."""
+
+    allowed_formats = ('PNG', 'JPEG', 'GIF', 'WEBP')
+
+    image = serializers.FileField()
+    thumbnail = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Recipe
+        fields = ('id', 'image', 'thumbnail')
+
+    def validate_image(self, value):
+        # Image.open читает только заголовок, пиксели не декодируются.
+        try:
+            with Image.open(value) as image:
+                image_format = image.format
+        except (OSError, Image.DecompressionBombError):
+            image_format = None
+        if image_format not in self.allowed_formats:
+            raise serializers.ValidationError(
+                'Загрузите корректное изображение PNG, JPEG, GIF или WebP.'
+            )
+        value.seek(0)
+        return value
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        validated_data['image_variants_ready'] = False
+        if instance.image:
+            schedule_thumbnails_cleanup(instance.image.name)
+        return super().update(instance, validated_data)
+
+    def get_thumbnail(self, obj):
+        return build_thumbnail_urls(self.context.get('request'), obj)
 
 
 class BaseRecipeItemSerializer(serializers.ModelSerializer):
     id = serializers.ReadOnlyField(source='recipe.id')
     name = serializers.ReadOnlyField(source='recipe.name')
     image = serializers.SerializerMethodField()
+    thumbnail = serializers.SerializerMethodField()
     cooking_time = serializers.ReadOnlyField(source='recipe.cooking_time')
 
     class Meta:
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'thumbnail', 'cooking_time')
         read_only_fields = fields
 
     def get_image(self, obj):
@@ -152,6 +286,9 @@ class BaseRecipeItemSerializer(serializers.ModelSerializer):
         image_url = obj.recipe.image.url
         return request.build_absolute_uri(image_url)
 
+    def get_thumbnail(self, obj):
+        return build_thumbnail_urls(self.context.get('request'), obj.recipe)
+
 
 class FavoriteSerializer(BaseRecipeItemSerializer):
     class Meta(BaseRecipeItemSerializer.Meta):
@@ -0,0 +1,137 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from foodgram.cache import bump_cache_version
+from ingredients.models import Ingredient
+from tags.models import Tag
+from users.models import Subscription
+
+from .cache import bump_recipe_versions
+from .feed import backfill, remove_author
+from .images import schedule_thumbnails
+from .matching import record_changes
+from .models import Recipe, RecipeIngredient
+from .search import update_search_index
+
+User = get_user_model()
+
+
+def invalidate_recipes(recipe_ids):
+    # Сбрасываем кэш после фиксации транзакции, иначе параллельный запрос
+    # успеет снова закэшировать старые данные.
+    recipe_ids = list(recipe_ids)
+    if recipe_ids:
+        transaction.on_commit(lambda: bump_recipe_versions(recipe_ids))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    invalidate_recipes([instance.pk])
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_relation_changed(sender, instance, **kwargs):
+    invalidate_recipes([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # tag.recipes.clear() передаёт pk_set=None, а после очистки
+        # рецептов тега уже не найти, поэтому запоминаем их заранее.
+        instance._cleared_recipe_ids = list(
+            instance.recipes.values_list('pk', flat=True)
+        )
+        return
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        recipe_ids = [instance.pk]
+    elif action == 'post_clear':
+        recipe_ids = instance.__dict__.pop('_cleared_recipe_ids', [])
+    else:
+        recipe_ids = list(pk_set)
+    invalidate_recipes(recipe_ids)
+    mark_similar_outdated(recipe_ids)
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_recipes(
+        Recipe.objects.filter(author=instance).values_list('pk', flat=True)
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def reference_changed(sender, **kwargs):
+    transaction.on_commit(lambda: bump_cache_version('recipes'))
+
+
+def reindex_recipes(recipe_ids):
+    # Поисковый документ и индекс подбора строятся из ингредиентов,
+    # которые при создании рецепта добавляются уже после его сохранения,
+    # поэтому ждём фиксации.
+    recipe_ids = list(recipe_ids)
+    if recipe_ids:
+        transaction.on_commit(lambda: update_search_index(recipe_ids))
+        transaction.on_commit(lambda: record_changes(recipe_ids))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_document_changed(sender, instance, **kwargs):
+    reindex_recipes([instance.pk])
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredients_changed(sender, instance, **kwargs):
+    reindex_recipes([instance.recipe_id])
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_renamed(sender, instance, created, **kwargs):
+    if not created:
+        reindex_recipes(
+            RecipeIngredient.objects.filter(
+                ingredient=instance
+            ).values_list('recipe_id', flat=True).distinct()
+        )
+
+
+def mark_similar_outdated(recipe_ids):
+    Recipe.objects.filter(
+        pk__in=recipe_ids, similar_outdated=False
+    ).update(similar_outdated=True)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_similarity_outdated(sender, instance, **kwargs):
+    mark_similar_outdated([instance.recipe_id])
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_changed(sender, instance, **kwargs):
+    if instance.image and not instance.image_variants_ready:
+        schedule_thumbnails(instance.pk)
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_created(sender, instance, created, **kwargs):
+    if created:
+        backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(sender, instance, **kwargs):
+    remove_author(instance.user_id, instance.author_id)
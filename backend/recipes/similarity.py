@@ -0,0 +1,181 @@
+"""Похожие рецепты по общим ингредиентам и тегам.
+
+Рецепт представляется разреженным вектором признаков (ингредиенты и
+теги) с весами TF-IDF, нормированным по длине; сходство — косинус.
+Кандидаты перебираются по инвертированному индексу ингредиентов, поэтому
+считаются только пары рецептов с общими ингредиентами; общие теги лишь
+добавляют им сходства. Тегов мало, и каждый есть у огромного числа
+рецептов, так что перебор по ним стоил бы больше всего остального.
+"""
+import heapq
+from collections import defaultdict
+from itertools import islice
+from math import log, sqrt
+
+from django.db import transaction
+from django.db.models import Count, Min
+
+from .models import Recipe, RecipeIngredient, RecipeSimilarity
+
+TOP_K = 10
+TAG_WEIGHT = 0.5
+# Признаки, которые есть почти у всех рецептов (соль, вода), ничего не
+# различают, но порождают больше всего пар — их пропускаем.
+MAX_FEATURE_SHARE = 0.2
+MIN_FEATURE_CUTOFF = 1000
+BATCH_SIZE = 1000
+
+
+class SimilarityModel:
+
+    def __init__(self, features):
+        """features: {id рецепта: множество признаков}."""
+        document_frequency = defaultdict(int)
+        for recipe_features in features.values():
+            for feature in recipe_features:
+                document_frequency[feature] += 1
+        total = len(features)
+        max_frequency = max(
+            int(total * MAX_FEATURE_SHARE), MIN_FEATURE_CUTOFF
+        )
+
+        self.vectors = {}
+        self.postings = defaultdict(list)
+        for recipe_id, recipe_features in features.items():
+            vector = {}
+            for feature in recipe_features:
+                frequency = document_frequency[feature]
+                if frequency > max_frequency:
+                    continue
+                weight = log((1 + total) / (1 + frequency)) + 1
+                if feature[0] == 't':
+                    weight *= TAG_WEIGHT
+                vector[feature] = weight
+            norm = sqrt(sum(weight * weight for weight in vector.values()))
+            if not norm:
+                continue
+            vector = {
+                feature: weight / norm for feature, weight in vector.items()
+            }
+            self.vectors[recipe_id] = vector
+            for feature, weight in vector.items():
+                if feature[0] == 'i':
+                    self.postings[feature].append((recipe_id, weight))
+
+    @classmethod
+    def load(cls):
+        features = defaultdict(set)
+        for recipe_id, ingredient_id in RecipeIngredient.objects.values_list(
+            'recipe_id', 'ingredient_id'
+        ).iterator(chunk_size=BATCH_SIZE * 10):
+            features[recipe_id].add(('i', ingredient_id))
+        for recipe_id, tag_id in Recipe.tags.through.objects.values_list(
+            'recipe_id', 'tag_id'
+        ).iterator(chunk_size=BATCH_SIZE * 10):
+            features[recipe_id].add(('t', tag_id))
+        return cls(features)
+
+    def scores(self, recipe_id):
+        """Косинусное сходство рецепта со всеми рецептами, у которых
+        есть общие ингредиенты."""
+        vector = self.vectors.get(recipe_id, {})
+        scores = defaultdict(float)
+        tags = []
+        for feature, weight in vector.items():
+            if feature[0] != 'i':
+                tags.append((feature, weight))
+                continue
+            for other_id, other_weight in self.postings[feature]:
+                scores[other_id] += weight * other_weight
+        scores.pop(recipe_id, None)
+        for other_id in scores:
+            other = self.vectors[other_id]
+            for feature, weight in tags:
+                scores[other_id] += weight * other.get(feature, 0.0)
+        return scores
+
+    def top(self, recipe_id, limit=TOP_K):
+        return heapq.nlargest(
+            limit,
+            self.scores(recipe_id).items(),
+            key=lambda item: (item[1], item[0]),
+        )
+
+
+def save_neighbours(model, recipe_ids):
+    """Перезаписывает похожие рецепты для recipe_ids пачками."""
+    recipe_ids = iter(recipe_ids)
+    saved = 0
+    while batch := list(islice(recipe_ids, BATCH_SIZE)):
+        with transaction.atomic():
+            RecipeSimilarity.objects.filter(recipe_id__in=batch).delete()
+            RecipeSimilarity.objects.bulk_create(
+                RecipeSimilarity(
+                    recipe_id=recipe_id, similar_id=similar_id, score=score
+                )
+                for recipe_id in batch
+                for similar_id, score in model.top(recipe_id)
+            )
+        saved += len(batch)
+    return saved
+
+
+def refresh_all():
+    # Флаги снимаются до чтения данных: рецепт, изменённый во время
+    # расчёта, останется помеченным до следующего запуска.
+    Recipe.objects.filter(similar_outdated=True).update(
+        similar_outdated=False
+    )
+    model = SimilarityModel.load()
+    return save_neighbours(
+        model, Recipe.objects.values_list('pk', flat=True).iterator()
+    )
+
+
+def refresh_outdated():
+    """Пересчитывает изменившиеся рецепты и тех, в чьих списках они
+    есть или должны появиться.
+
+    Сходство симметрично, поэтому новые оценки изменившегося рецепта
+    сравниваются с худшей оценкой в списке каждого соседа. Веса IDF
+    остальных рецептов при этом не пересчитываются, поэтому время от
+    времени стоит запускать полный пересчёт (--all).
+    """
+    outdated = set(
+        Recipe.objects.filter(similar_outdated=True).values_list(
+            'pk', flat=True
+        )
+    )
+    if not outdated:
+        return 0
+    Recipe.objects.filter(pk__in=outdated).update(similar_outdated=False)
+    model = SimilarityModel.load()
+    affected = set(outdated)
+    affected.update(
+        RecipeSimilarity.objects.filter(similar_id__in=outdated)
+        .values_list('recipe_id', flat=True)
+    )
+    candidates = defaultdict(float)
+    for recipe_id in outdated:
+        for other_id, score in model.scores(recipe_id).items():
+            candidates[other_id] = max(candidates[other_id], score)
+    candidates = {
+        other_id: score
+        for other_id, score in candidates.items()
+        if other_id not in affected
+    }
+    candidate_ids = iter(candidates)
+    while batch := list(islice(candidate_ids, BATCH_SIZE)):
+        lists = {
+            recipe_id: (size, worst)
+            for recipe_id, size, worst in RecipeSimilarity.objects.filter(
+                recipe_id__in=batch
+            ).values('recipe_id').annotate(
+                size=Count('id'), worst=Min('score')
+            ).values_list('recipe_id', 'size', 'worst')
+        }
+        for other_id in batch:
+            size, worst = lists.get(other_id, (0, 0))
+            if size < TOP_K or candidates[other_id] > worst:
+                affected.add(other_id)
+    return save_neighbours(model, sorted(affected))
@@ -0,0 +1,778 @@
+from base64 import b64encode
+from io import BytesIO
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.redis import (RedisCache, RedisCacheClient,
+                                              RedisSerializer)
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from foodgram.cache import (aget_cache_version, bump_cache_version,
+                            get_cache_version)
+from ingredients.catalogue import get_catalogue as get_ingredient_catalogue
+from ingredients.models import Ingredient
+from recipes.cache import (bump_recipe_versions, get_cached_recipe,
+                           set_cached_recipe)
+from recipes.feed import fan_out, read_feed
+from recipes.images import (VARIANT_FORMATS, build_thumbnails,
+                            render_thumbnails, thumbnail_name)
+from recipes.models import (Favorite, FeedEntry, PopularAuthor, Recipe,
+                            RecipeIngredient, ShoppingCart, ShoppingListItem,
+                            ShoppingListItemQuerySet)
+from recipes.query_plans import (explain_cases, get_sample,
+                                 get_seq_scan_pattern, seed)
+from tags.catalogue import CACHE_NAMESPACE as TAGS_NAMESPACE
+from tags.catalogue import get_catalogue
+from tags.models import Tag
+from users.models import Subscription
+
+User = get_user_model()
+
+
+class RecipeQueryCountTest(TestCase):
+    """Число запросов к базе не зависит от количества рецептов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com', password='x'
+        )
+        cls.token = Token.objects.create(user=cls.user)
+        authors = [
+            User.objects.create_user(
+                username=f'author{number}',
+                email=f'author{number}@example.com',
+                password='x',
+            )
+            for number in range(3)
+        ]
+        Subscription.objects.create(user=cls.user, author=authors[0])
+        tags = [
+            Tag.objects.create(
+                name=f'Тег {number}', slug=f'tag{number}', color='#000000'
+            )
+            for number in range(3)
+        ]
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {number}', measurement_unit='г')
+            for number in range(5)
+        )
+        cls.recipes = []
+        for number in range(20):
+            recipe = Recipe.objects.create(
+                author=authors[number % len(authors)],
+                name=f'Рецепт {number}',
+                text='-',
+                image='recipes_images/test.png',
+                cooking_time=1,
+            )
+            recipe.tags.set(tags[:number % len(tags) + 1])
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient, amount=1
+                )
+                for ingredient in ingredients[:number % len(ingredients) + 1]
+            )
+            cls.recipes.append(recipe)
+        Favorite.objects.create(user=cls.user, recipe=cls.recipes[0])
+        ShoppingCart.objects.create(user=cls.user, recipe=cls.recipes[1])
+
+    def setUp(self):
+        cache.clear()
+        # Справочник тегов для фильтра загружается один раз на процесс.
+        get_catalogue()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_list_query_count_does_not_depend_on_page_size(self):
+        counts = {
+            limit: self.count_queries(f'/api/recipes/?limit={limit}')
+            for limit in (1, 5, 20)
+        }
+        self.assertEqual(len(set(counts.values())), 1, counts)
+
+    def test_list_query_count(self):
+        # Токен, количество, страница, авторы, ингредиенты, теги.
+        with self.assertNumQueries(6):
+            self.client.get('/api/recipes/?limit=10')
+
+    def test_detail_query_count(self):
+        url = f'/api/recipes/{self.recipes[-1].pk}/'
+        # Без кэша: токен, рецепт, автор, ингредиенты, теги.
+        with self.assertNumQueries(5):
+            self.client.get(url)
+        # Из кэша читаются только флаги пользователя и счётчики.
+        with self.assertNumQueries(2):
+            self.client.get(url)
+
+    def test_detail_query_count_does_not_depend_on_relations(self):
+        few = self.count_queries(f'/api/recipes/{self.recipes[0].pk}/')
+        many = self.count_queries(f'/api/recipes/{self.recipes[-1].pk}/')
+        self.assertEqual(few, many)
+
+
+@override_settings(ROOT_URLCONF='foodgram.asgi_urls')
+class AsyncReadViewTest(TestCase):
+    """Асинхронные обработчики из foodgram.asgi_urls отвечают так же,
+    как обработчики DRF."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com', password='x'
+        )
+        cls.token = Token.objects.create(user=cls.user)
+        cls.tag = Tag.objects.create(
+            name='Завтрак', slug='breakfast', color='#000000'
+        )
+        cls.ingredient = Ingredient.objects.create(
+            name='Картофель', measurement_unit='г'
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.user,
+            name='Пюре',
+            text='-',
+            image='recipes_images/test.png',
+            cooking_time=1,
+        )
+        cls.recipe.tags.set([cls.tag])
+        RecipeIngredient.objects.create(
+            recipe=cls.recipe, ingredient=cls.ingredient, amount=300
+        )
+        ShoppingCart.objects.create(user=cls.user, recipe=cls.recipe)
+        ShoppingListItem.objects.create(
+            user=cls.user, ingredient=cls.ingredient, total_amount=300
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = AsyncClient()
+        self.auth = {'Authorization': f'Token {self.token.key}'}
+        self.sync_client = APIClient()
+        self.sync_client.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.token.key}'
+        )
+
+    async def get_content(self, response):
+        if not response.streaming:
+            return response.content
+        return b''.join([chunk async for chunk in response.streaming_content])
+
+    async def aget(self, *args, **kwargs):
+        return await self.client.get(*args, **kwargs)
+
+    def sync_json(self, url):
+        with override_settings(ROOT_URLCONF='foodgram.urls'):
+            return self.sync_client.get(url).json()
+
+    def test_wsgi_urlconf_uses_drf_views(self):
+        with override_settings(ROOT_URLCONF='foodgram.urls'):
+            self.assertTrue(hasattr(resolve('/api/tags/').func, 'cls'))
+        self.assertFalse(hasattr(resolve('/api/tags/').func, 'cls'))
+
+    async def test_recipe_list_and_detail(self):
+        for url in ('/api/recipes/', f'/api/recipes/{self.recipe.pk}/'):
+            response = await self.client.get(url, headers=self.auth)
+            self.assertEqual(response.status_code, 200)
+            expected = await sync_to_async(self.sync_json)(url)
+            self.assertEqual(response.json(), expected)
+        response = await self.client.get('/api/recipes/999/')
+        self.assertEqual(response.status_code, 404)
+
+    async def test_invalid_token_is_rejected_for_recipes(self):
+        response = await self.client.get(
+            '/api/recipes/', headers={'Authorization': 'Token invalid'}
+        )
+        self.assertEqual(response.status_code, 401)
+
+    async def test_shopping_list_is_streamed(self):
+        for list_format, start in (
+            ('csv', 'Ингредиент'),
+            ('txt', 'Список покупок'),
+            ('pdf', '%PDF'),
+        ):
+            response = await self.client.get(
+                '/api/recipes/download_shopping_cart/',
+                {'format': list_format},
+                headers=self.auth,
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.streaming)
+            content = await self.get_content(response)
+            self.assertTrue(content.startswith(start.encode()), list_format)
+            if list_format != 'pdf':
+                self.assertIn('Картофель', content.decode())
+
+    async def test_shopping_list_requires_authentication(self):
+        response = await self.client.get(
+            '/api/recipes/download_shopping_cart/'
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_reference_not_modified(self):
+        get = async_to_sync(self.aget)
+        response = get('/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(0):
+            response = get(
+                '/api/tags/', headers={'If-None-Match': response['ETag']}
+            )
+        self.assertEqual(response.status_code, 304)
+
+    def test_reference_skips_authentication(self):
+        get = async_to_sync(self.aget)
+        get('/api/ingredients/')
+        with self.assertNumQueries(0):
+            response = get(
+                '/api/ingredients/', headers={'Authorization': 'Token bad'}
+            )
+        self.assertEqual(response.status_code, 200)
+
+
+class FeedTest(TestCase):
+    """Лента подписок: раскладка при публикации, подмешивание рецептов
+    популярных авторов и очистка после отписки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.other, cls.author = (
+            User.objects.create_user(
+                username=name, email=f'{name}@example.com', password='x'
+            )
+            for name in ('reader', 'other', 'author')
+        )
+        cls.token = Token.objects.create(user=cls.reader)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def publish(self, number):
+        recipe = Recipe.objects.create(
+            author=self.author,
+            name=f'Рецепт {number}',
+            text='-',
+            image='recipes_images/test.png',
+            cooking_time=1,
+        )
+        fan_out(recipe)
+        return recipe
+
+    def feed_ids(self, user):
+        entries, _ = read_feed(user, limit=100)
+        return [recipe_id for _, recipe_id in entries]
+
+    def test_fan_out_to_subscribers(self):
+        Subscription.objects.create(user=self.reader, author=self.author)
+        recipes = [self.publish(number) for number in range(3)]
+        self.assertEqual(
+            self.feed_ids(self.reader),
+            [recipe.pk for recipe in reversed(recipes)],
+        )
+        self.assertEqual(self.feed_ids(self.other), [])
+
+    def test_subscription_backfills_feed(self):
+        recipe = self.publish(0)
+        Subscription.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.feed_ids(self.reader), [recipe.pk])
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_popular_author_recipes_are_merged_on_read(self):
+        Subscription.objects.create(user=self.reader, author=self.author)
+        Subscription.objects.create(user=self.other, author=self.author)
+        recipe = self.publish(0)
+        self.assertTrue(
+            PopularAuthor.objects.filter(author=self.author).exists()
+        )
+        self.assertFalse(FeedEntry.objects.filter(recipe=recipe).exists())
+        self.assertEqual(self.feed_ids(self.reader)[0], recipe.pk)
+        self.assertEqual(self.feed_ids(self.other)[0], recipe.pk)
+
+    def test_unsubscribe_removes_author_recipes(self):
+        subscription = Subscription.objects.create(
+            user=self.reader, author=self.author
+        )
+        self.publish(0)
+        subscription.delete()
+        self.assertEqual(self.feed_ids(self.reader), [])
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+
+    def test_feed_pages(self):
+        Subscription.objects.create(user=self.reader, author=self.author)
+        recipes = [self.publish(number) for number in range(3)]
+        response = self.client.get('/api/recipes/feed/?limit=2')
+        self.assertEqual(response.status_code, 200)
+        first = response.json()
+        self.assertEqual(
+            [recipe['id'] for recipe in first['results']],
+            [recipes[2].pk, recipes[1].pk],
+        )
+        second = self.client.get(first['next']).json()
+        self.assertEqual(
+            [recipe['id'] for recipe in second['results']], [recipes[0].pk]
+        )
+        self.assertIsNone(second['next'])
+
+
+class ShoppingListRaceTest(TestCase):
+    """Позиция, вставленная параллельной транзакцией, не роняет
+    пересчёт списка покупок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='buyer', email='buyer@example.com', password='x'
+        )
+        cls.ingredient = Ingredient.objects.create(
+            name='Мука', measurement_unit='г'
+        )
+
+    def add_concurrent_item(self):
+        ShoppingListItem.objects.create(
+            user=self.user, ingredient=self.ingredient, total_amount=5
+        )
+
+    def test_concurrent_insert_is_added_to(self):
+        attempts = []
+
+        def racing_apply_amounts(queryset, *args):
+            attempts.append(args)
+            if len(attempts) > 1:
+                # Параллельная транзакция закоммитила свою позицию.
+                self.add_concurrent_item()
+            return apply_amounts(queryset, *args)
+
+        def racing_bulk_create(queryset, objs, *args, **kwargs):
+            if len(attempts) == 1:
+                # Позиция появилась после select_for_update(), вставка
+                # нарушает уникальность и откатывается.
+                self.add_concurrent_item()
+            return QuerySet.bulk_create(queryset, objs, *args, **kwargs)
+
+        apply_amounts = ShoppingListItemQuerySet.apply_amounts
+        with mock.patch.object(
+            ShoppingListItemQuerySet, 'apply_amounts',
+            autospec=True, side_effect=racing_apply_amounts,
+        ), mock.patch.object(
+            ShoppingListItemQuerySet, 'bulk_create',
+            autospec=True, side_effect=racing_bulk_create,
+        ):
+            ShoppingListItem.objects.add_amounts(
+                [self.user.pk], {self.ingredient.pk: 3}
+            )
+        self.assertEqual(len(attempts), 2)
+        item = ShoppingListItem.objects.get(user=self.user)
+        self.assertEqual(item.total_amount, 8)
+
+
+class RecipeTagSignalTest(TestCase):
+    """Изменение тегов рецепта с любой стороны связи сбрасывает кэш
+    рецептов и помечает их подборку похожих устаревшей."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username='author', email='author@example.com', password='x'
+        )
+        cls.tag = Tag.objects.create(
+            name='Завтрак', slug='breakfast', color='#000000'
+        )
+        cls.recipes = [
+            Recipe.objects.create(
+                author=author,
+                name=f'Рецепт {number}',
+                text='-',
+                image='recipes_images/test.png',
+                cooking_time=1,
+            )
+            for number in range(2)
+        ]
+        for recipe in cls.recipes:
+            recipe.tags.add(cls.tag)
+
+    def setUp(self):
+        Recipe.objects.update(similar_outdated=False)
+
+    def assert_changed(self, change, recipes):
+        with mock.patch(
+            'recipes.signals.bump_recipe_versions'
+        ) as bump, self.captureOnCommitCallbacks(execute=True):
+            change()
+        bumped = {
+            recipe_id
+            for call in bump.call_args_list
+            for recipe_id in call.args[0]
+        }
+        self.assertEqual(bumped, {recipe.pk for recipe in recipes})
+        self.assertEqual(
+            set(
+                Recipe.objects.filter(similar_outdated=True)
+                .values_list('pk', flat=True)
+            ),
+            {recipe.pk for recipe in recipes},
+        )
+
+    def test_recipe_tags_clear(self):
+        self.assert_changed(self.recipes[0].tags.clear, self.recipes[:1])
+
+    def test_tag_recipes_remove(self):
+        self.assert_changed(
+            lambda: self.tag.recipes.remove(self.recipes[1]),
+            self.recipes[1:],
+        )
+
+    def test_tag_recipes_clear(self):
+        self.assert_changed(self.tag.recipes.clear, self.recipes)
+
+
+def make_png():
+    image = BytesIO()
+    Image.new('RGB', (1, 1)).save(image, 'PNG')
+    return image.getvalue()
+
+
+class RecipeIngredientsValidationTest(TestCase):
+    """Ингредиенты рецепта находятся одним запросом на весь список."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = cls.enterClassContext(TemporaryDirectory())
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media_root))
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='cook', email='cook@example.com', password='x'
+        )
+        cls.token = Token.objects.create(user=cls.user)
+        cls.tag = Tag.objects.create(
+            name='Обед', slug='lunch', color='#000000'
+        )
+
+    def setUp(self):
+        cache.clear()
+        # Снимок справочника загружен до появления ингредиентов, поэтому
+        # все они ищутся в базе.
+        get_ingredient_catalogue()
+        self.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'Специя {number}', measurement_unit='г')
+            for number in range(5)
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def post_recipe(self, ingredient_ids):
+        return self.client.post(
+            '/api/recipes/',
+            {
+                'name': 'Рецепт',
+                'text': '-',
+                'cooking_time': 1,
+                'tags': [self.tag.pk],
+                'image': 'data:image/png;base64,'
+                + b64encode(make_png()).decode(),
+                'ingredients': [
+                    {'id': ingredient_id, 'amount': 1}
+                    for ingredient_id in ingredient_ids
+                ],
+            },
+            format='json',
+        )
+
+    def test_ingredients_resolved_in_one_query(self):
+        table = Ingredient._meta.db_table
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post_recipe(
+                [ingredient.pk for ingredient in self.ingredients]
+            )
+        self.assertEqual(response.status_code, 201, response.json())
+        lookups = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('SELECT') and f'FROM "{table}"'
+            in query['sql']
+        ]
+        self.assertEqual(len(lookups), 1, lookups)
+
+    def test_all_missing_ingredients_reported(self):
+        response = self.post_recipe([self.ingredients[0].pk, 998, 999])
+        self.assertEqual(response.status_code, 400)
+        errors = ' '.join(response.json()['ingredients'])
+        self.assertIn('998', errors)
+        self.assertIn('999', errors)
+
+
+class QueryPlanTest(TestCase):
+    """Основные сочетания фильтров ленты рецептов не просматривают
+    таблицы целиком."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(300)
+
+    def test_filters_use_indexes(self):
+        self.assertIsNotNone(get_seq_scan_pattern())
+        plans = explain_cases(*get_sample(), limit=10)
+        for name, (plan, tables) in plans.items():
+            with self.subTest(name):
+                self.assertEqual(tables, [], plan)
+
+
+class FakeRedis:
+    """Хранилище в памяти с теми командами redis-py, которые вызывает
+    RedisCacheClient. Значения хранятся байтами, как их вернул бы
+    сервер; сроки жизни ключей не учитываются."""
+
+    def __init__(self):
+        self.data = {}
+
+    @staticmethod
+    def encode(value):
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode()
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = self.encode(value)
+        return True
+
+    def mset(self, mapping):
+        for key, value in mapping.items():
+            self.set(key, value)
+        return True
+
+    def exists(self, key):
+        return int(key in self.data)
+
+    def incr(self, key, amount=1):
+        value = int(self.data.get(key, 0)) + amount
+        self.data[key] = self.encode(value)
+        return value
+
+    def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def expire(self, key, timeout):
+        return key in self.data
+
+    persist = expire
+
+    def pipeline(self):
+        return FakeRedisPipeline(self)
+
+    def flushdb(self):
+        self.data.clear()
+        return True
+
+
+class FakeRedisPipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        command = getattr(self.client, name)
+        return lambda *args, **kwargs: self.commands.append(
+            (command, args, kwargs)
+        )
+
+    def execute(self):
+        commands, self.commands = self.commands, []
+        return [command(*args, **kwargs) for command, args, kwargs in commands]
+
+
+class FakeRedisCacheClient(RedisCacheClient):
+    def __init__(self, servers, **options):
+        self._serializer = RedisSerializer()
+        self._redis = FakeRedis()
+
+    def get_client(self, key=None, *, write=False):
+        return self._redis
+
+
+class FakeRedisCache(RedisCache):
+    def __init__(self, server, params):
+        super().__init__(server, params)
+        self._class = FakeRedisCacheClient
+
+
+class CacheVersionTestMixin:
+    """Смена версии пространства имён скрывает все его записи."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_bump_hides_cached_recipe(self):
+        set_cached_recipe(1, {'name': 'old'})
+        self.assertEqual(get_cached_recipe(1), {'name': 'old'})
+        bump_cache_version('recipes')
+        self.assertIsNone(get_cached_recipe(1))
+        set_cached_recipe(1, {'name': 'new'})
+        self.assertEqual(get_cached_recipe(1), {'name': 'new'})
+
+    def test_recipe_bump_hides_only_that_recipe(self):
+        set_cached_recipe(1, {'name': 'first'})
+        set_cached_recipe(2, {'name': 'second'})
+        bump_recipe_versions([1])
+        self.assertIsNone(get_cached_recipe(1))
+        self.assertEqual(get_cached_recipe(2), {'name': 'second'})
+
+    def test_bumps_in_one_second_differ(self):
+        with mock.patch('foodgram.cache.time.time', return_value=1000):
+            versions = [get_cache_version('tags')]
+            for _ in range(2):
+                bump_cache_version('tags')
+                versions.append(get_cache_version('tags'))
+        self.assertEqual(versions, [1000, 1001, 1002])
+        self.assertEqual(
+            async_to_sync(aget_cache_version)('tags'), versions[-1]
+        )
+
+    def test_bump_moves_version_to_current_time(self):
+        with mock.patch('foodgram.cache.time.time', return_value=1000):
+            get_cache_version('tags')
+        with mock.patch('foodgram.cache.time.time', return_value=2000):
+            bump_cache_version('tags')
+        self.assertEqual(get_cache_version('tags'), 2000)
+
+    def test_catalogue_reloaded_after_bump_elsewhere(self):
+        get_catalogue()
+        # Тег добавлен другим процессом: сигналы здесь не срабатывают,
+        # снимок обновляется только по версии в общем кэше.
+        tag, = Tag.objects.bulk_create([
+            Tag(name='Ужин', slug='dinner', color='#000000')
+        ])
+        self.assertNotIn(tag.slug, get_catalogue().by_slug)
+        bump_cache_version(TAGS_NAMESPACE)
+        self.assertIn(tag.slug, get_catalogue().by_slug)
+
+    def test_stale_reference_not_served(self):
+        client = APIClient()
+        response = client.get('/api/tags/')
+        Tag.objects.bulk_create([
+            Tag(name='Ужин', slug='dinner', color='#000000')
+        ])
+        bump_cache_version(TAGS_NAMESPACE)
+        response = client.get(
+            '/api/tags/', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('dinner', [tag['slug'] for tag in response.json()])
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'cache-version-test',
+}})
+class LocMemCacheVersionTest(CacheVersionTestMixin, TestCase):
+    pass
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'recipes.tests.FakeRedisCache',
+    'LOCATION': 'redis://fake:6379/1',
+}})
+class RedisCacheVersionTest(CacheVersionTestMixin, TestCase):
+    pass
+
+
+class ThumbnailCleanupTest(TestCase):
+    """Миниатюры заменённого изображения удаляются после фиксации."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = cls.enterClassContext(TemporaryDirectory())
+        cls.enterClassContext(override_settings(MEDIA_ROOT=cls.media_root))
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='baker', email='baker@example.com', password='x'
+        )
+        cls.token = Token.objects.create(user=cls.author)
+
+    def setUp(self):
+        self.recipe = Recipe.objects.create(
+            author=self.author,
+            name='Пирог',
+            text='-',
+            image=ContentFile(make_png(), name='pie.png'),
+            cooking_time=1,
+            image_variants_ready=True,
+        )
+        render_thumbnails(self.recipe.image.name)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def thumbnails(self, image_name):
+        return [
+            thumbnail_name(image_name, image_format)
+            for image_format in VARIANT_FORMATS
+        ]
+
+    def assert_exist(self, names, exist=True):
+        for name in names:
+            self.assertEqual(default_storage.exists(name), exist, name)
+
+    @mock.patch('recipes.signals.schedule_thumbnails')
+    def test_replaced_image_thumbnails_deleted_on_commit(self, _):
+        old = self.thumbnails(self.recipe.image.name)
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.put(
+                f'/api/recipes/{self.recipe.pk}/image/',
+                {'image': ContentFile(make_png(), name='cake.png')},
+                format='multipart',
+            )
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assert_exist(old)
+        for callback in callbacks:
+            callback()
+        self.assert_exist(old, exist=False)
+        self.recipe.refresh_from_db()
+        self.assertTrue(default_storage.exists(self.recipe.image.name))
+
+    def test_thumbnails_of_replaced_image_deleted_after_build(self):
+        old_name = self.recipe.image.name
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            image_variants_ready=False
+        )
+
+        def replace_while_rendering(image_name):
+            render_thumbnails(image_name)
+            Recipe.objects.filter(pk=self.recipe.pk).update(
+                image='recipes_images/other.png'
+            )
+
+        with mock.patch(
+            'recipes.images.render_thumbnails',
+            side_effect=replace_while_rendering,
+        ):
+            self.assertFalse(build_thumbnails(self.recipe.pk))
+        self.assert_exist(self.thumbnails(old_name), exist=False)
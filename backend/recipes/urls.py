@@ -1,6 +1,8 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from .async_views import (RecipeDetailView, RecipeListView,
+                          ShoppingCartDownloadView)
 from .views import FavoriteView, RecipeViewSet, ShoppingCartView
 
 app_name = 'recipes'
@@ -8,6 +10,27 @@ app_name = 'recipes'
 router_v1 = DefaultRouter()
 
 router_v1.register('recipes', RecipeViewSet, basename='recipes')
+drf_views = {url.name: url.callback for url in router_v1.urls}
+
+# Маршруты foodgram.asgi_urls: частые запросы на чтение под ASGI
+# обрабатываются асинхронно, остальные методы передаются тем же
+# обработчикам DRF, что и в router_v1.
+async_urlpatterns = [
+    path(
+        'recipes/',
+        RecipeListView.as_view(sync_view=drf_views['recipes-list']),
+    ),
+    path(
+        'recipes/download_shopping_cart/',
+        ShoppingCartDownloadView.as_view(
+            sync_view=drf_views['recipes-download-shopping-cart']
+        ),
+    ),
+    path(
+        'recipes/<int:pk>/',
+        RecipeDetailView.as_view(sync_view=drf_views['recipes-detail']),
+    ),
+]
 
 urlpatterns = [
     path('', include(router_v1.urls)),
@@ -1,18 +1,95 @@
-import csv
-
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import permissions, viewsets
+from rest_framework import filters, permissions, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from .filters import RecipeFilter
+from .cache import get_cached_recipe, set_cached_recipe
+from .feed import fan_out, read_feed
+from .filters import RecipeFilter, RecipeSearchFilter
+from .matching import SCORES, get_index
 from .mixins import RecipeActionMixin
-from .models import Favorite, Recipe, RecipeIngredient, ShoppingCart
-from .pagination import CustomPageNumberPagination
+from .models import (Favorite, Recipe, RecipeSimilarity, ShoppingCart,
+                     ShoppingListItem)
+from .pagination import (CustomPageNumberPagination, FeedPagination,
+                         RecipeCursorPagination)
+from .parsers import RecipeImageParser
+from .renderers import (CSVShoppingListRenderer, PDFShoppingListRenderer,
+                        TXTShoppingListRenderer)
 from .serializers import (FavoriteSerializer, RecipeCreateSerializer,
-                          RecipeSerializer, ShoppingCartSerializer)
+                          RecipeImageSerializer, RecipeSerializer,
+                          ShoppingCartSerializer)
+
+MATCH_LIMIT = 10
+MAX_MATCH_LIMIT = 100
+
+RECIPE_VOLATILE_FIELDS = (
+    'is_favorited', 'is_in_shopping_cart', 'favorites_count', 'carts_count',
+)
+
+SHOPPING_LIST_RENDERERS = [
+    CSVShoppingListRenderer,
+    TXTShoppingListRenderer,
+    PDFShoppingListRenderer,
+]
+
+
+def shopping_list_items(user):
+    return (
+        ShoppingListItem.objects.filter(user=user)
+        .values(
+            'ingredient__name',
+            'ingredient__measurement_unit',
+            'total_amount',
+        )
+        .order_by('ingredient__name')
+    )
+
+
+def shopping_list_response(renderer, content):
+    """Отдаёт список покупок файлом по частям из content (обычного или
+    асинхронного итератора)."""
+    content_type = renderer.media_type
+    if renderer.charset:
+        content_type = f'{content_type}; charset={renderer.charset}'
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = (
+        f'attachment; filename="shopping_cart.{renderer.format}"'
+    )
+    return response
+
+
+def cacheable_recipe_data(data):
+    # Зависящие от пользователя поля в кэш не попадают: ключи
+    # сохраняются только ради порядка полей в ответе.
+    return {
+        **data,
+        **dict.fromkeys(RECIPE_VOLATILE_FIELDS),
+        'author': {**data['author'], 'is_subscribed': None},
+    }
+
+
+def volatile_recipe_fields(recipe_id, user):
+    return Recipe.objects.filter(pk=recipe_id).with_user_flags(
+        user
+    ).with_author_subscribed(user).values(
+        *RECIPE_VOLATILE_FIELDS, 'author_is_subscribed'
+    )
+
+
+def apply_volatile_fields(data, volatile):
+    """Накладывает на данные из кэша поля, зависящие от пользователя,
+    и часто меняющиеся счётчики."""
+    is_subscribed = volatile.pop('author_is_subscribed')
+    return {
+        **data,
+        **volatile,
+        'author': {**data['author'], 'is_subscribed': is_subscribed},
+    }
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
@@ -20,59 +97,201 @@ class RecipeViewSet(viewsets.ModelViewSet):
     serializer_class = RecipeSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     pagination_class = CustomPageNumberPagination
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [
+        DjangoFilterBackend, filters.OrderingFilter, RecipeSearchFilter,
+    ]
     filterset_class = RecipeFilter
+    ordering_fields = ('created_at', 'favorites_count', 'carts_count')
+    ordering = RecipeCursorPagination.ordering
+
+    @property
+    def paginator(self):
+        """Курсорная пагинация включается параметром ?pagination=cursor
+        (или наличием ?cursor=), по умолчанию — постраничная."""
+        if not hasattr(self, '_paginator'):
+            query_params = self.request.query_params
+            if (
+                query_params.get('pagination') == 'cursor'
+                or RecipeCursorPagination.cursor_query_param in query_params
+            ):
+                self._paginator = RecipeCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def get_queryset(self):
+        user = self.request.user
+        return Recipe.objects.with_user_flags(user).with_related(user)
 
     def get_serializer_class(self):
         if self.action in ['create', 'partial_update']:
             return RecipeCreateSerializer
         return RecipeSerializer
 
-    def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+    def retrieve(self, request, *args, **kwargs):
+        """Отдаёт рецепт из кэша, накладывая поверх поля, зависящие от
+        пользователя, и часто меняющиеся счётчики."""
+        try:
+            recipe_id = int(kwargs[self.lookup_field])
+        except ValueError:
+            return super().retrieve(request, *args, **kwargs)
+
+        data = get_cached_recipe(recipe_id)
+        if data is None:
+            response = super().retrieve(request, *args, **kwargs)
+            set_cached_recipe(recipe_id, cacheable_recipe_data(response.data))
+            return response
+
+        volatile = volatile_recipe_fields(recipe_id, request.user).first()
+        if volatile is None:
+            raise Http404
+        return Response(apply_volatile_fields(data, volatile))
 
     @action(detail=False, methods=['get'])
-    def download_shopping_cart(self, request, pk=None):
-        user = request.user
+    def match(self, request):
+        """Рецепты, которые можно приготовить из указанных ингредиентов:
+        ?ingredients=1,2,3, необязательные ?score=coverage|jaccard
+        и ?limit=."""
+        try:
+            ingredient_ids = {
+                int(value)
+                for param in request.query_params.getlist('ingredients')
+                for value in param.split(',')
+                if value.strip()
+            }
+        except ValueError:
+            raise ValidationError(
+                {'ingredients': 'Укажите id ингредиентов через запятую.'}
+            )
+        try:
+            limit = int(request.query_params.get('limit', MATCH_LIMIT))
+        except ValueError:
+            raise ValidationError({'limit': 'Укажите целое число.'})
+        if not ingredient_ids:
+            raise ValidationError({'ingredients': 'Обязательный параметр.'})
+        score = request.query_params.get('score', 'coverage')
+        if score not in SCORES:
+            raise ValidationError(
+                {'score': f'Допустимые значения: {", ".join(SCORES)}.'}
+            )
+        limit = min(max(limit, 1), MAX_MATCH_LIMIT)
 
-        shopping_cart_recipes = ShoppingCart.objects.filter(
-            user=user
-        ).values_list(
-            'recipe__id', flat=True
+        matches = get_index().match(ingredient_ids, limit, score)
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _, _ in matches]
         )
+        data = []
+        for recipe_id, value, matched in matches:
+            if recipe_id not in recipes:
+                continue
+            item = self.get_serializer(recipes[recipe_id]).data
+            item['match'] = {'score': round(value, 4), 'matched': matched}
+            data.append(item)
+        return Response(data)
 
-        ingredients = (
-            RecipeIngredient.objects.filter(recipe__in=shopping_cart_recipes)
-            .values('ingredient__name', 'ingredient__measurement_unit')
-            .annotate(total_amount=Sum('amount'))
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """Похожие рецепты по общим ингредиентам и тегам. Списки заранее
+        считает команда compute_similar_recipes."""
+        try:
+            recipe_id = int(pk)
+        except ValueError:
+            raise Http404
+        neighbours = list(
+            RecipeSimilarity.objects.filter(recipe_id=recipe_id)
+            .order_by('-score')
+            .values_list('similar_id', 'score')
         )
+        if not neighbours and not Recipe.objects.filter(pk=recipe_id).exists():
+            raise Http404
+        recipes = self.get_queryset().in_bulk(
+            [similar_id for similar_id, _ in neighbours]
+        )
+        data = []
+        for similar_id, score in neighbours:
+            item = self.get_serializer(recipes[similar_id]).data
+            item['similarity'] = round(score, 4)
+            data.append(item)
+        return Response(data)
 
-        response = HttpResponse(content_type='text/csv')
-        response[
-            'Content-Disposition'
-        ] = 'attachment; filename="shopping_cart.csv"'
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[permissions.IsAuthenticated],
+    )
+    def feed(self, request):
+        """Рецепты авторов из подписок, новые первыми. Страницы
+        листаются по ссылке next, размер задаёт ?limit=."""
+        paginator = FeedPagination()
+        position = paginator.get_position(request)
+        entries, has_next = read_feed(
+            request.user, position, paginator.get_page_size(request)
+        )
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for _, recipe_id in entries]
+        )
+        data = [
+            self.get_serializer(recipes[recipe_id]).data
+            for _, recipe_id in entries
+            if recipe_id in recipes
+        ]
+        return paginator.get_paginated_response(
+            data, entries[-1] if has_next else None
+        )
 
-        writer = csv.writer(response)
+    @transaction.atomic
+    def perform_create(self, serializer):
+        recipe = serializer.save(author=self.request.user)
+        fan_out(recipe)
 
-        writer.writerow(['Ингредиент', 'Количество', 'Единица измерения'])
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        ShoppingListItem.objects.remove_recipe(
+            list(instance.carts.values_list('user_id', flat=True)),
+            instance.pk,
+        )
+        instance.delete()
 
-        writer.writerows(
-            [
-                [
-                    ingredient['ingredient__name'],
-                    ingredient['total_amount'],
-                    ingredient['ingredient__measurement_unit'],
-                ]
-                for ingredient in ingredients
-            ]
+    @action(
+        detail=True,
+        methods=['put'],
+        permission_classes=[permissions.IsAuthenticated],
+        parser_classes=[RecipeImageParser],
+    )
+    def image(self, request, pk=None):
+        """Загрузка изображения файлом (multipart/form-data, поле image)
+        вместо base64 в JSON. Файл пишется на диск частями по мере
+        получения и переносится в хранилище без копирования в память."""
+        recipe = get_object_or_404(Recipe, pk=pk)
+        if recipe.author_id != request.user.id:
+            raise PermissionDenied(
+                'Изменять изображение может только автор рецепта.'
+            )
+        serializer = RecipeImageSerializer(
+            recipe, data=request.data, context={'request': request}
         )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data)
 
-        return response
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[permissions.IsAuthenticated],
+        renderer_classes=SHOPPING_LIST_RENDERERS,
+    )
+    def download_shopping_cart(self, request, format=None):
+        renderer = request.accepted_renderer
+        return shopping_list_response(
+            renderer,
+            renderer.stream(shopping_list_items(request.user).iterator()),
+        )
 
 
 class FavoriteView(RecipeActionMixin, APIView):
     serializer_class = FavoriteSerializer
     pagination_class = CustomPageNumberPagination
+    counter_field = 'favorites_count'
 
     def post(self, request, pk: int):
         error_message = (
@@ -80,7 +299,8 @@ class FavoriteView(RecipeActionMixin, APIView):
             f'Рецепт "{pk}" уже есть в избранном'
         )
         return self.perform_recipe_action(
-            request, pk, self.add_to_list, Favorite, error_message
+            request, pk, self.add_to_list, Favorite, error_message,
+            counter_delta=1,
         )
 
     def delete(self, request, pk: int):
@@ -89,27 +309,39 @@ class FavoriteView(RecipeActionMixin, APIView):
             f'Рецепт "{pk}" нету в избранном'
         )
         return self.perform_recipe_action(
-            request, pk, self.remove_from_list, Favorite, error_message
+            request, pk, self.remove_from_list, Favorite, error_message,
+            counter_delta=-1,
         )
 
 
 class ShoppingCartView(RecipeActionMixin, APIView):
     serializer_class = ShoppingCartSerializer
+    counter_field = 'carts_count'
 
+    @transaction.atomic
     def post(self, request, pk: int):
         error_message = (
             f'Ошибка добавления в список покупок. '
             f'Рецепт "{pk}" уже есть в списке покупок'
         )
-        return self.perform_recipe_action(
-            request, pk, self.add_to_list, ShoppingCart, error_message
+        response = self.perform_recipe_action(
+            request, pk, self.add_to_list, ShoppingCart, error_message,
+            counter_delta=1,
         )
+        if response.status_code == status.HTTP_204_NO_CONTENT:
+            ShoppingListItem.objects.add_recipe([request.user.id], pk)
+        return response
 
+    @transaction.atomic
     def delete(self, request, pk: int):
         error_message = (
             f'Ошибка удаления из списка покупок. '
             f'Рецепт "{pk}" нет в списке покупок'
         )
-        return self.perform_recipe_action(
-            request, pk, self.remove_from_list, ShoppingCart, error_message
+        response = self.perform_recipe_action(
+            request, pk, self.remove_from_list, ShoppingCart, error_message,
+            counter_delta=-1,
         )
+        if response.status_code == status.HTTP_204_NO_CONTENT:
+            ShoppingListItem.objects.remove_recipe([request.user.id], pk)
+        return response
@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class TagsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'tags'
+
+    def ready(self):
+        from foodgram import checks  # noqa: F401
+
+        from . import signals  # noqa: F401
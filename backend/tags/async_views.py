@@ -0,0 +1,22 @@
+from django.http import Http404
+
+from foodgram.async_views import AsyncReferenceView
+from tags import catalogue
+from tags.serializers import TagSerializer
+
+
+class TagListView(AsyncReferenceView):
+    catalogue = catalogue
+
+    def get_data(self, request, catalogue):
+        return TagSerializer(catalogue.tags, many=True).data
+
+
+class TagDetailView(AsyncReferenceView):
+    catalogue = catalogue
+
+    def get_data(self, request, catalogue, pk):
+        tag = catalogue.by_id.get(pk)
+        if tag is None:
+            raise Http404
+        return TagSerializer(tag).data
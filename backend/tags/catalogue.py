@@ -0,0 +1,41 @@
+from foodgram.cache import bump_cache_version, get_cache_version
+
+from .models import Tag
+
+CACHE_NAMESPACE = 'tags'
+
+_catalogue = None
+
+
+class TagCatalogue:
+    """Снимок справочника тегов в памяти процесса."""
+
+    def __init__(self, version, tags):
+        self.version = version
+        self.tags = list(tags)
+        self.by_slug = {tag.slug: tag for tag in self.tags}
+        self.by_id = {tag.id: tag for tag in self.tags}
+
+    def choices(self):
+        return [(tag.slug, tag.name) for tag in self.tags]
+
+
+def get_version():
+    return get_cache_version(CACHE_NAMESPACE)
+
+
+def bump_version():
+    """Помечает справочник изменённым во всех процессах."""
+    global _catalogue
+    _catalogue = None
+    bump_cache_version(CACHE_NAMESPACE)
+
+
+def get_catalogue():
+    """Возвращает справочник, перечитывая его из базы только после
+    смены версии."""
+    global _catalogue
+    version = get_version()
+    if _catalogue is None or _catalogue.version != version:
+        _catalogue = TagCatalogue(version, Tag.objects.order_by('id'))
+    return _catalogue
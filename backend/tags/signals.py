@@ -0,0 +1,14 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .catalogue import bump_version
+from .models import Tag
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, **kwargs):
+    # Другие процессы перечитают справочник только после фиксации
+    # транзакции, иначе они закэшируют его старое содержимое.
+    transaction.on_commit(bump_version)
@@ -1,6 +1,7 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from .async_views import TagDetailView, TagListView
 from .views import TagViewSet
 
 app_name = 'tags'
@@ -8,6 +9,18 @@ app_name = 'tags'
 router_v1 = DefaultRouter()
 
 router_v1.register('tags', TagViewSet, basename='tags')
+drf_views = {url.name: url.callback for url in router_v1.urls}
+
+async_urlpatterns = [
+    path(
+        'tags/',
+        TagListView.as_view(sync_view=drf_views['tags-list']),
+    ),
+    path(
+        'tags/<int:pk>/',
+        TagDetailView.as_view(sync_view=drf_views['tags-detail']),
+    ),
+]
 
 urlpatterns = [
     path('', include(router_v1.urls)),
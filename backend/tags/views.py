@@ -1,9 +1,12 @@
 from rest_framework import viewsets
 
+from foodgram.reference import ReferenceCacheMixin
+from tags import catalogue
 from tags.models import Tag
 from tags.serializers import TagSerializer
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(ReferenceCacheMixin, viewsets.ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    catalogue = catalogue
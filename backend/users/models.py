@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import Exists, OuterRef, Value
 
 User = get_user_model()
 
@@ -34,3 +35,14 @@ class Subscription(models.Model):
 
     def __str__(self):
         return f'Подписка {self.user} на {self.author}'
+
+
+def with_is_subscribed(queryset, user):
+    """Аннотирует пользователей флагом подписки текущего пользователя."""
+    if not user.is_authenticated:
+        return queryset.annotate(is_subscribed=Value(False))
+    return queryset.annotate(
+        is_subscribed=Exists(
+            Subscription.objects.filter(user=user, author=OuterRef('pk'))
+        )
+    )
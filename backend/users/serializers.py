@@ -2,6 +2,7 @@ from django.contrib.auth import get_user_model
 from djoser.serializers import UserCreateSerializer
 from rest_framework import serializers
 
+from recipes.images import build_thumbnail_urls
 from recipes.models import Recipe
 from .models import Subscription
 
@@ -12,6 +13,8 @@ class CustomUserSerializer(serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context['request'].user
         if user.is_authenticated:
             return Subscription.objects.filter(user=user, author=obj).exists()
@@ -46,14 +49,19 @@ class CustomUserCreateSerializer(UserCreateSerializer):
 
 
 class RecipeInSubscriptionSerializer(serializers.ModelSerializer):
+    thumbnail = serializers.SerializerMethodField()
+
     class Meta:
         model = Recipe
-        fields = ['id', 'name', 'image', 'cooking_time']
+        fields = ['id', 'name', 'image', 'thumbnail', 'cooking_time']
+
+    def get_thumbnail(self, obj):
+        return build_thumbnail_urls(self.context.get('request'), obj)
 
 
 class SubscriptionSerializer(serializers.ModelSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = User
@@ -61,21 +69,8 @@ class SubscriptionSerializer(serializers.ModelSerializer):
                   'first_name', 'last_name', 'recipes', 'recipes_count']
 
     def get_recipes(self, user):
-        recipes_limit = self.context.get('recipes_limit')
-        subscribed_author_ids = user.subscriber.values_list(
-            'author__id', flat=True
+        recipes = self.context.get('recipes_by_author', {}).get(user.id, [])
+        serializer = RecipeInSubscriptionSerializer(
+            recipes, many=True, context=self.context
         )
-        recipes = Recipe.objects.filter(
-            author_id__in=subscribed_author_ids
-        )[:recipes_limit]
-        serializer = RecipeInSubscriptionSerializer(recipes, many=True)
         return serializer.data
-
-    def get_recipes_count(self, user):
-        subscribed_author_ids = user.subscriber.values_list(
-            'author__id', flat=True
-        )
-        recipes_count = Recipe.objects.filter(
-            author_id__in=subscribed_author_ids
-        ).count()
-        return recipes_count
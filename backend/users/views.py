@@ -1,4 +1,7 @@
+from collections import defaultdict
+
 from django.contrib.auth import get_user_model
+from django.db.models import Count
 from djoser.views import UserViewSet as DjosrUserViewSet
 from rest_framework import status
 from rest_framework.decorators import action
@@ -6,8 +9,9 @@ from rest_framework.permissions import (IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
 
+from recipes.models import Recipe
 from recipes.pagination import CustomPageNumberPagination
-from users.models import Subscription
+from users.models import Subscription, with_is_subscribed
 from users.serializers import CustomUserSerializer, SubscriptionSerializer
 
 User = get_user_model()
@@ -19,6 +23,9 @@ class UserViewSet(DjosrUserViewSet):
     serializer_class = CustomUserSerializer
     pagination_class = CustomPageNumberPagination
 
+    def get_queryset(self):
+        return with_is_subscribed(super().get_queryset(), self.request.user)
+
     @action(
         detail=False,
         methods=('get',),
@@ -27,19 +34,38 @@ class UserViewSet(DjosrUserViewSet):
     )
     def subscriptions(self, request):
         user = self.request.user
-        user_subscriptions = Subscription.objects.filter(user=user)
-        authors = user_subscriptions.values_list('author__id', flat=True)
-        queryset = User.objects.filter(pk__in=authors)
-        paginated_queryset = self.paginate_queryset(queryset)
-        recipes_limit = self.request.query_params.get('recipes_limit', None)
-        recipes_limit = int(recipes_limit) > 0 and int(recipes_limit) or None
+        queryset = User.objects.filter(subscriber__user=user).annotate(
+            recipes_count=Count('recipe')
+        ).order_by('id')
+        page = self.paginate_queryset(queryset)
+        authors = list(queryset) if page is None else page
+
+        recipes_limit = self.request.query_params.get('recipes_limit')
+        try:
+            recipes_limit = int(recipes_limit)
+        except (TypeError, ValueError):
+            recipes_limit = None
+        if recipes_limit is not None and recipes_limit < 1:
+            recipes_limit = None
+
+        recipes_by_author = defaultdict(list)
+        recipes = Recipe.objects.latest_by_author(
+            [author.id for author in authors], recipes_limit
+        )
+        for recipe in recipes:
+            recipes_by_author[recipe.author_id].append(recipe)
 
         serializer = self.get_serializer(
-            paginated_queryset,
+            authors,
             many=True,
-            context={'recipes_limit': recipes_limit}
+            context={
+                **self.get_serializer_context(),
+                'recipes_by_author': recipes_by_author,
+            }
         )
 
+        if page is None:
+            return Response(serializer.data)
         return self.get_paginated_response(serializer.data)
 
     @action(
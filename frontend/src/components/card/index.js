@@ -7,6 +7,7 @@ const Card = ({
   name = 'Без названия',
   id,
   image,
+  thumbnail,
   is_favorited,
   is_in_shopping_cart,
   tags,
@@ -21,7 +22,10 @@ const Card = ({
       <LinkComponent
         className={styles.card__title}
         href={`/recipes/${id}`}
-        title={<div className={styles.card__image} style={{ backgroundImage: `url(${ image })` }} />}
+        title={<picture>
+          {thumbnail && <source srcSet={thumbnail.webp} type='image/webp' />}
+          <img src={thumbnail ? thumbnail.jpeg : image} alt={name} className={styles.card__image} />
+        </picture>}
       />
       <div className={styles.card__body}>
         <LinkComponent